@@ -4,11 +4,19 @@ Exports each selected mesh as an individual P3D file including proxies
 """
 
 import bpy
-import bmesh
 import os
+import re
 from bpy_extras.io_utils import ExportHelper
 from bpy.props import StringProperty, BoolProperty, EnumProperty
 from bpy.types import Operator
+from mathutils import Matrix
+
+# Filename cleanup patterns, compiled once at module load
+_INVALID_CHARS_RE = re.compile(r'[<>:"/\\|?*\s]')
+_MULTI_UNDERSCORE_RE = re.compile(r'_+')
+
+# Objects already sitting at this transform have nothing to apply
+_IDENTITY_MATRIX = Matrix.Identity(4)
 
 class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
     """Export each selected mesh as individual P3D files"""
@@ -106,8 +114,13 @@ class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
     @classmethod
     def poll(cls, context):
         # Check if we have mesh objects selected or in scene
-        if context.selected_objects:
-            return any(obj.type == 'MESH' for obj in context.selected_objects)
+        # selected_objects builds a new list on every access, so fetch it once
+        selected = context.selected_objects
+        if selected:
+            for obj in selected:
+                if obj.type == 'MESH':
+                    return True
+            return False
         return any(obj.type == 'MESH' for obj in context.scene.objects)
 
     def get_export_objects(self, context):
@@ -119,34 +132,31 @@ class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
         
         return objects
 
+    def get_base_name_getter(self):
+        """Return a function that picks the source name for the naming convention"""
+        if self.naming_convention == 'MESH_NAME':
+            return lambda obj: obj.data.name
+        # OBJECT_NAME and CUSTOM both use the object's name
+        return lambda obj: obj.name
+
+    def get_name_format(self):
+        """Build the filename template with the batch's prefix and suffix baked in"""
+        # Escape braces so user text is not treated as format fields
+        prefix = self.custom_prefix.replace("{", "{{").replace("}", "}}")
+        suffix = self.custom_suffix.replace("{", "{{").replace("}", "}}")
+        return f"{prefix}{{}}{suffix}.p3d"
+
     def get_filename(self, obj):
         """Generate filename for an object based on naming convention"""
-        if self.naming_convention == 'OBJECT_NAME':
-            base_name = obj.name
-        elif self.naming_convention == 'MESH_NAME':
-            base_name = obj.data.name
-        else:  # CUSTOM
-            base_name = obj.name
-        
-        # Clean the name for filesystem
-        base_name = self.clean_filename(base_name)
-        
-        # Add prefix and suffix
-        if self.custom_prefix:
-            base_name = f"{self.custom_prefix}{base_name}"
-        if self.custom_suffix:
-            base_name = f"{base_name}{self.custom_suffix}"
-            
-        return f"{base_name}.p3d"
+        # Clean the name for filesystem, then add prefix and suffix
+        return self._name_fmt.format(self.clean_filename(self._base_name_of(obj)))
 
     def clean_filename(self, name):
         """Clean a name to be filesystem-safe"""
-        # Remove or replace invalid characters
-        import re
         # Replace spaces and special characters with underscores
-        name = re.sub(r'[<>:"/\\|?*\s]', '_', name)
+        name = _INVALID_CHARS_RE.sub('_', name)
         # Remove multiple underscores
-        name = re.sub(r'_+', '_', name)
+        name = _MULTI_UNDERSCORE_RE.sub('_', name)
         # Remove leading/trailing underscores
         name = name.strip('_')
         return name
@@ -167,95 +177,155 @@ class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
         return True
 
     def get_object_hierarchy(self, obj):
-        """Get object and all its children (proxies) recursively"""
-        objects = [obj]
+        """Get object and all its children (proxies) in depth-first order"""
+        objects = []
+        stack = [obj]
         
         # Only include children if the option is enabled
-        if self.include_children:
-            def get_children_recursive(parent):
-                for child in parent.children:
-                    objects.append(child)
-                    get_children_recursive(child)  # Get children of children
-            
-            get_children_recursive(obj)
+        while stack:
+            current = stack.pop()
+            objects.append(current)
+            if self.include_children:
+                # Reversed so children come out in their original order
+                stack.extend(reversed(current.children))
         
         return objects
 
+    def needs_data_copy(self, obj):
+        """Check whether export preparation will modify the object's data in place"""
+        # Applying transforms rewrites the data (and refuses multi-user data)
+        if self.apply_transforms and obj.matrix_world != _IDENTITY_MATRIX:
+            return True
+        
+        if obj.type == 'MESH' and self.validate_meshes:
+            # Baking modifiers already produces a new mesh, so only validating
+            # the original mesh needs a private copy
+            will_bake = self.apply_modifiers and any(m.show_viewport for m in obj.modifiers)
+            return not will_bake
+        
+        # Otherwise the copy can share the original data; temp cleanup only
+        # frees meshes without other users, so the original is left alone
+        return False
+
+    def prepare_object_copy(self, orig_obj, temp_collection):
+        """Duplicate a single object into the temp collection and prepare its mesh"""
+        # Duplicate the object to avoid modifying the original
+        new_obj = orig_obj.copy()
+        if orig_obj.data and self.needs_data_copy(orig_obj):
+            new_obj.data = orig_obj.data.copy()
+        temp_collection.objects.link(new_obj)
+        self._temp_objects.append(new_obj)
+        
+        # Set up LOD properties for mesh objects
+        if orig_obj.type == 'MESH':
+            if not self.setup_lod_properties(new_obj):
+                self._warnings.append(f"Could not set up LOD properties for {orig_obj.name}")
+            
+            # Apply modifiers if requested (only for mesh objects)
+            mesh_is_fresh = False
+            if self.apply_modifiers:
+                mesh_is_fresh = self.apply_object_modifiers(new_obj)
+                
+            # Validate mesh if requested (only for mesh objects); meshes
+            # baked from the evaluated depsgraph are already valid
+            if self.validate_meshes and not mesh_is_fresh:
+                # A failed bake leaves the copy on the original's mesh, which must not be touched
+                if new_obj.data == orig_obj.data:
+                    new_obj.data = orig_obj.data.copy()
+                new_obj.data.validate(clean_customdata=False)
+        
+        return new_obj
+
     def prepare_object_hierarchy_for_export(self, obj, temp_collection):
         """Prepare an object and all its children for P3D export"""
+        # Single object without proxies: no hierarchy to walk or re-parent
+        if not self.include_children or not obj.children:
+            new_obj = self.prepare_object_copy(obj, temp_collection)
+            if self.apply_transforms:
+                self.apply_object_transforms((new_obj,))
+            return [new_obj]
+        
         # Get all objects in the hierarchy (main object + children/proxies)
         hierarchy_objects = self.get_object_hierarchy(obj)
-        prepared_objects = []
         
         # Duplicate each object in the hierarchy
-        for orig_obj in hierarchy_objects:
-            # Duplicate the object to avoid modifying the original
-            new_obj = orig_obj.copy()
-            if orig_obj.data:
-                new_obj.data = orig_obj.data.copy()
-            temp_collection.objects.link(new_obj)
-            
-            # Ensure object is in object mode
-            bpy.context.view_layer.objects.active = new_obj
-            if new_obj.mode != 'OBJECT':
-                bpy.ops.object.mode_set(mode='OBJECT')
-            
-            # Set up LOD properties for mesh objects
-            if orig_obj.type == 'MESH':
-                if not self.setup_lod_properties(new_obj):
-                    self.report({'WARNING'}, f"Could not set up LOD properties for {orig_obj.name}")
-                
-                # Apply modifiers if requested (only for mesh objects)
-                if self.apply_modifiers:
-                    self.apply_object_modifiers(new_obj)
-                    
-                # Validate mesh if requested (only for mesh objects)
-                if self.validate_meshes:
-                    new_obj.data.validate(clean_customdata=False)
-            
-            prepared_objects.append(new_obj)
+        prepared_objects = [self.prepare_object_copy(orig_obj, temp_collection) for orig_obj in hierarchy_objects]
         
         # Rebuild parent-child relationships in the duplicated objects
-        for i, orig_obj in enumerate(hierarchy_objects):
-            new_obj = prepared_objects[i]
-            
-            # Find parent in the prepared objects list
-            if orig_obj.parent and orig_obj.parent in hierarchy_objects:
-                parent_index = hierarchy_objects.index(orig_obj.parent)
-                new_obj.parent = prepared_objects[parent_index]
+        copy_of = dict(zip(hierarchy_objects, prepared_objects))
+        for orig_obj, new_obj in zip(hierarchy_objects, prepared_objects):
+            # Find the parent's copy, if the parent is part of the hierarchy
+            new_parent = copy_of.get(orig_obj.parent)
+            if new_parent is not None:
+                new_obj.parent = new_parent
                 new_obj.parent_type = orig_obj.parent_type
                 new_obj.parent_bone = orig_obj.parent_bone
         
-        # Apply transforms if requested (to all objects in hierarchy)
+        # Apply transforms if requested, in one operator call for the whole hierarchy
         if self.apply_transforms:
-            for new_obj in prepared_objects:
-                self.apply_object_transforms(new_obj)
+            self.apply_object_transforms(prepared_objects)
         
         return prepared_objects
 
     def apply_object_modifiers(self, obj):
-        """Apply all visible modifiers to an object"""
-        bpy.context.view_layer.objects.active = obj
-        
-        # Get modifiers that are visible
-        modifiers = [m for m in obj.modifiers if m.show_viewport]
-        
-        for modifier in modifiers:
-            try:
-                bpy.ops.object.modifier_apply(modifier=modifier.name)
-            except RuntimeError as e:
-                self.report({'WARNING'}, f"Could not apply modifier {modifier.name} on {obj.name}: {str(e)}")
+        """Bake all visible modifiers into a new mesh with a single evaluation
+        Returns True if the object now holds a freshly baked mesh
+        """
+        # Nothing to bake if no modifier contributes to the evaluated mesh
+        if not any(m.show_viewport for m in obj.modifiers):
+            return False
+
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        try:
+            baked_mesh = bpy.data.meshes.new_from_object(
+                obj.evaluated_get(depsgraph),
+                preserve_all_data_layers=True,
+                depsgraph=depsgraph,
+            )
+        except RuntimeError as e:
+            self._warnings.append(f"Could not apply modifiers on {obj.name}: {str(e)}")
+            return False
 
-    def apply_object_transforms(self, obj):
-        """Apply transforms to an object"""
-        bpy.context.view_layer.objects.active = obj
-        bpy.ops.object.select_all(action='DESELECT')
-        obj.select_set(True)
+        # Swap in the baked mesh and drop the now-applied modifier stack
+        old_mesh = obj.data
+        obj.modifiers.clear()
+        obj.data = baked_mesh
+        if old_mesh.users == 0:
+            bpy.data.meshes.remove(old_mesh)
+        return True
+
+    def apply_object_transforms(self, objects):
+        """Apply transforms to all given objects with a single transform_apply call"""
+        # Skip the coordinate rewrite for objects already at identity
+        objects = [obj for obj in objects if obj.matrix_world != _IDENTITY_MATRIX]
+        if not objects:
+            return
         
         try:
-            bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
+            with bpy.context.temp_override(
+                active_object=objects[0],
+                object=objects[0],
+                selected_objects=objects,
+                selected_editable_objects=objects,
+            ):
+                bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
         except RuntimeError as e:
-            self.report({'WARNING'}, f"Could not apply transforms to {obj.name}: {str(e)}")
+            names = ", ".join(obj.name for obj in objects)
+            self._warnings.append(f"Could not apply transforms to {names}: {str(e)}")
+
+    def remove_temp_objects(self, objects):
+        """Free temp objects and their meshes with a single batch_remove call"""
+        objects = list(objects)
+        if not objects:
+            return
+        
+        # Only free meshes that are not shared with anything outside the temp set
+        meshes = [obj.data for obj in objects
+                  if obj.type == 'MESH' and obj.data and obj.data.users <= 1]
+        try:
+            bpy.data.batch_remove(ids=objects + meshes)
+        except (ReferenceError, RuntimeError):
+            pass  # Object already removed or invalid
 
     def create_temp_collection(self, context):
         """Create a temporary collection for export processing"""
@@ -266,39 +336,15 @@ class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
             context.scene.collection.children.link(temp)
         
         # Clear any existing objects
-        objects_to_remove = [obj for obj in temp.objects]
-        for obj in objects_to_remove:
-            try:
-                temp.objects.unlink(obj)
-                if obj.data and obj.data.users <= 1:
-                    if obj.type == 'MESH':
-                        bpy.data.meshes.remove(obj.data)
-                bpy.data.objects.remove(obj)
-            except (ReferenceError, RuntimeError):
-                pass
+        self.remove_temp_objects(temp.objects)
         
         return temp
 
     def cleanup_temp_collection(self, temp):
         """Clean up the temporary collection"""
-        # Get list of objects to remove before we start removing them
-        objects_to_remove = [obj for obj in temp.objects]
-        
-        # Remove objects from collection first, then from bpy.data
-        for obj in objects_to_remove:
-            try:
-                # Remove from collection
-                if obj.name in temp.objects:
-                    temp.objects.unlink(obj)
-                # Remove mesh data if it exists and has no other users
-                if obj.data and obj.data.users <= 1:
-                    if obj.type == 'MESH':
-                        mesh_data = obj.data
-                        bpy.data.meshes.remove(mesh_data)
-                # Remove the object itself
-                bpy.data.objects.remove(obj)
-            except (ReferenceError, RuntimeError):
-                pass  # Object already removed or invalid
+        # Remove all tracked temp objects and their meshes in one pass
+        self.remove_temp_objects(self._temp_objects)
+        self._temp_objects.clear()
 
         # Remove the collection
         try:
@@ -306,6 +352,14 @@ class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
         except (ReferenceError, RuntimeError):
             pass
 
+    def _resolve_export_operator(self):
+        """Find the Arma 3 Object Builder P3D export operator, or None if unavailable"""
+        if hasattr(bpy.ops, 'a3ob') and hasattr(bpy.ops.a3ob, 'export_p3d'):
+            return bpy.ops.a3ob.export_p3d
+        if hasattr(bpy.ops, 'export_scene') and hasattr(bpy.ops.export_scene, 'p3d'):
+            return bpy.ops.export_scene.p3d
+        return None
+
     def export_single_object(self, context, obj, export_dir, temp_collection):
         """Export a single object as P3D file including its children (proxies)"""
         try:
@@ -314,71 +368,19 @@ class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
             if not export_objects:
                 return False, f"Failed to prepare {obj.name} hierarchy for export"
             
-            # Generate filename
-            filename = self.get_filename(obj)
-            filepath = os.path.join(export_dir, filename)
-            
-            # Select all objects in the hierarchy for export
-            bpy.ops.object.select_all(action='DESELECT')
-            for export_obj in export_objects:
-                export_obj.select_set(True)
-            
-            # Set the main object as active
-            context.view_layer.objects.active = export_objects[0]
-            
-            # Check if Arma 3 Object Builder addon is available
-            addon_found = False
-            export_operator = None
-            
-            # Check for different possible addon module names
-            possible_addon_names = [
-                'arma3objectbuilder',
-                'Arma3ObjectBuilder', 
-                'a3ob',
-                'A3OB'
-            ]
-            
-            for addon_name in possible_addon_names:
-                if addon_name in bpy.context.preferences.addons:
-                    addon_found = True
-                    break
-            
-            # Also check if the export operator is available directly
-            if hasattr(bpy.ops, 'a3ob') and hasattr(bpy.ops.a3ob, 'export_p3d'):
-                addon_found = True
-                export_operator = bpy.ops.a3ob.export_p3d
-            elif hasattr(bpy.ops, 'export_scene') and hasattr(bpy.ops.export_scene, 'p3d'):
-                addon_found = True  
-                export_operator = bpy.ops.export_scene.p3d
-            
-            if not addon_found:
-                # Let's also check what addons are actually enabled for debugging
-                enabled_addons = [addon for addon in bpy.context.preferences.addons.keys()]
-                print(f"DEBUG: Enabled addons: {enabled_addons}")
-                return False, "Arma 3 Object Builder addon not found. Please install and enable it first."
-            
-            # Count objects being exported for reporting
-            mesh_count = sum(1 for obj in export_objects if obj.type == 'MESH')
-            proxy_count = len(export_objects) - mesh_count
+            filepath = export_dir + self.get_filename(obj)
             
             # Try to export using the P3D exporter
             try:
-                # Try the most likely operator first
-                result = None
-                if export_operator:
-                    result = export_operator(
-                        filepath=filepath,
-                        use_selection=True,
-                        apply_modifiers=False,  # We already applied them
-                        apply_transforms=False,  # We already applied them
-                        validate_meshes=False,  # We already validated
-                        preserve_normals=self.preserve_normals,
-                        sort_sections=self.sort_sections,
-                        force_lowercase=self.force_lowercase,
-                        relative_paths=self.relative_paths,
-                    )
-                elif hasattr(bpy.ops.a3ob, 'export_p3d'):
-                    result = bpy.ops.a3ob.export_p3d(
+                # Present the hierarchy as the selection, with the main object
+                # active, without touching the view layer's real selection
+                with context.temp_override(
+                    active_object=export_objects[0],
+                    object=export_objects[0],
+                    selected_objects=export_objects,
+                    selected_editable_objects=export_objects,
+                ):
+                    result = self._export_op(
                         filepath=filepath,
                         use_selection=True,
                         apply_modifiers=False,  # We already applied them
@@ -389,13 +391,6 @@ class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
                         force_lowercase=self.force_lowercase,
                         relative_paths=self.relative_paths,
                     )
-                elif hasattr(bpy.ops.export_scene, 'p3d'):
-                    result = bpy.ops.export_scene.p3d(
-                        filepath=filepath,
-                        use_selection=True,
-                    )
-                else:
-                    return False, "P3D export operator not available. The addon may not be properly installed."
                 
                 # Check if the export was successful
                 if result and 'CANCELLED' in result:
@@ -403,11 +398,7 @@ class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
                 elif result and 'FINISHED' not in result:
                     return False, f"P3D export failed with result: {result}"
                 
-                # Create detailed success message
-                if proxy_count > 0:
-                    return True, f"Successfully exported {filename} (1 mesh + {proxy_count} proxies)"
-                else:
-                    return True, f"Successfully exported {filename}"
+                return True, None
                     
             except AttributeError as e:
                 return False, f"P3D export operator not found. Check if Arma 3 Object Builder addon is properly enabled. Error: {str(e)}"
@@ -418,8 +409,21 @@ class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
             return False, f"Unexpected error exporting {obj.name}: {str(e)}"
 
     def execute(self, context):
-        # Get export directory
-        export_dir = os.path.dirname(self.filepath)
+        # Get export directory, with a trailing separator so filenames can be appended
+        export_dir = os.path.join(os.path.dirname(self.filepath), "")
+        
+        # The naming convention is fixed for the whole batch
+        self._base_name_of = self.get_base_name_getter()
+        self._name_fmt = self.get_name_format()
+        
+        # Resolve the P3D exporter once for the whole batch
+        self._export_op = self._resolve_export_operator()
+        if self._export_op is None:
+            # Let's also check what addons are actually enabled for debugging
+            enabled_addons = list(context.preferences.addons.keys())
+            print(f"DEBUG: Enabled addons: {enabled_addons}")
+            self.report({'ERROR'}, "Arma 3 Object Builder addon not found. Please install and enable it first.")
+            return {'CANCELLED'}
         
         # Get objects to export
         objects = self.get_export_objects(context)
@@ -428,52 +432,42 @@ class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
             self.report({'ERROR'}, "No mesh objects found to export")
             return {'CANCELLED'}
         
-        # Create temporary collection
+        # Create temporary collection; copies linked into it are tracked in
+        # _temp_objects so cleanup never has to rescan the collection
         temp_collection = self.create_temp_collection(context)
+        self._temp_objects = []
+        wm = context.window_manager
         
         # Track results
         successful_exports = 0
         failed_exports = []
+        self._warnings = []
         
         try:
+            wm.progress_begin(0, len(objects))
+            
             # Export each object
             for i, obj in enumerate(objects):
                 # Update progress
-                context.window_manager.progress_begin(0, len(objects))
-                context.window_manager.progress_update(i)
+                wm.progress_update(i)
                 
                 success, message = self.export_single_object(context, obj, export_dir, temp_collection)
                 
+                # Results are collected and reported once after the batch
                 if success:
                     successful_exports += 1
-                    self.report({'INFO'}, message)
                 else:
                     failed_exports.append((obj.name, message))
-                    self.report({'WARNING'}, message)
                 
-                # Clear temp collection for next object
-                temp_objects = [obj for obj in temp_collection.objects]
-                
-                # Remove objects from collection and bpy.data
-                for obj in temp_objects:
-                    try:
-                        # Unlink from collection
-                        if obj.name in temp_collection.objects:
-                            temp_collection.objects.unlink(obj)
-                        # Remove mesh data if it has no other users
-                        if obj.data and obj.data.users <= 1 and obj.type == 'MESH':
-                            mesh_data = obj.data
-                            bpy.data.meshes.remove(mesh_data)
-                        # Remove the object
-                        bpy.data.objects.remove(obj)
-                    except (ReferenceError, RuntimeError):
-                        pass  # Object already removed or invalid
+                # Clear temp objects for next object
+                self.remove_temp_objects(self._temp_objects)
+                self._temp_objects.clear()
             
-            context.window_manager.progress_end()
+            wm.progress_end()
             
         except Exception as e:
             # Handle any unexpected errors in the main execute method
-            context.window_manager.progress_end()
+            wm.progress_end()
             self.report({'ERROR'}, f"Unexpected error during batch export: {str(e)}")
             return {'CANCELLED'}
             
@@ -489,6 +483,13 @@ class DAYZ_OT_BatchExportP3D(Operator, ExportHelper):
         if successful_exports > 0:
             self.report({'INFO'}, f"Successfully exported {successful_exports} objects to P3D files")
         
+        if self._warnings:
+            self.report({'WARNING'}, f"{len(self._warnings)} warnings during export")
+            for warning in self._warnings[:5]:  # Show first 5 warnings
+                self.report({'WARNING'}, warning)
+            if len(self._warnings) > 5:
+                self.report({'WARNING'}, f"... and {len(self._warnings) - 5} more warnings")
+        
         if failed_exports:
             self.report({'WARNING'}, f"{len(failed_exports)} exports failed")
             for obj_name, error in failed_exports[:5]:  # Show first 5 errors
@@ -537,15 +538,12 @@ batch_p3d_classes = (
     DAYZ_OT_BatchExportP3D,
 )
 
+_register_batch_p3d_classes, _unregister_batch_p3d_classes = bpy.utils.register_classes_factory(batch_p3d_classes)
+
 def register_batch_p3d():
     """Register batch P3D export classes"""
-    for cls in batch_p3d_classes:
-        bpy.utils.register_class(cls)
+    _register_batch_p3d_classes()
 
 def unregister_batch_p3d():
     """Unregister batch P3D export classes"""
-    for cls in reversed(batch_p3d_classes):
-        try:
-            bpy.utils.unregister_class(cls)
-        except RuntimeError:
-            pass
\ No newline at end of file
+    _unregister_batch_p3d_classes()
\ No newline at end of file
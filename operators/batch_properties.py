@@ -4,9 +4,31 @@ Adds named properties to .p3d files in a directory
 """
 
 import bpy
+import logging
 import os
 from bpy.props import StringProperty, BoolProperty, CollectionProperty, IntProperty
 from bpy_extras.io_utils import ImportHelper
+from .logging_utils import get_console_logger
+
+# Per-file progress goes to the console only when verbose output is enabled
+logger = get_console_logger(__name__)
+
+# Every casing of the extension, so names can be matched without lowercasing them
+_P3D_SUFFIXES = ('.p3d', '.p3D', '.P3d', '.P3D')
+
+def iter_p3d_files(directory, recursive):
+    """Yield the paths of .p3d files in a directory, optionally including subdirectories"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # DirEntry caches the file type, so no extra stat per entry
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    try:
+                        yield from iter_p3d_files(entry.path, recursive)
+                    except OSError:
+                        pass  # Skip unreadable subdirectories like os.walk does
+            elif entry.name.endswith(_P3D_SUFFIXES) and entry.is_file():
+                yield entry.path
 
 # Property Groups
 class DAYZ_NamedProperty(bpy.types.PropertyGroup):
@@ -39,6 +61,12 @@ class DAYZ_BatchPropertiesSettings(bpy.types.PropertyGroup):
         default=True
     )
     
+    verbose: bpy.props.BoolProperty(
+        name="Verbose Output",
+        description="Print per-file progress to the system console",
+        default=False
+    )
+    
     # Named properties collection
     named_properties: bpy.props.CollectionProperty(
         type=DAYZ_NamedProperty
@@ -118,16 +146,23 @@ class DAYZ_OT_ProcessBatchProperties(bpy.types.Operator):
             self.report({'ERROR'}, "No target directory specified")
             return {'CANCELLED'}
         
-        if not os.path.isdir(settings.target_directory):
-            self.report({'ERROR'}, f"Target directory does not exist: {settings.target_directory}")
-            return {'CANCELLED'}
-        
         if not settings.named_properties:
             self.report({'ERROR'}, "No named properties defined")
             return {'CANCELLED'}
         
-        # Process files
-        processed_count = self.process_p3d_files_in_directory(settings.target_directory, settings)
+        # Scanning the directory doubles as the existence check
+        try:
+            p3d_files = list(iter_p3d_files(settings.target_directory, settings.recursive_search))
+        except (FileNotFoundError, NotADirectoryError):
+            self.report({'ERROR'}, f"Target directory does not exist: {settings.target_directory}")
+            return {'CANCELLED'}
+        except OSError as e:
+            self.report({'ERROR'}, f"Error reading directory: {e}")
+            return {'CANCELLED'}
+        
+        logger.setLevel(logging.DEBUG if settings.verbose else logging.WARNING)
+        
+        processed_count = self.process_p3d_files(p3d_files, settings)
         
         if processed_count > 0:
             self.report({'INFO'}, f"Successfully processed {processed_count} .p3d files")
@@ -136,116 +171,109 @@ class DAYZ_OT_ProcessBatchProperties(bpy.types.Operator):
         
         return {'FINISHED'}
     
-    def clear_scene(self):
-        """Safely removes all objects and collections from the current scene."""
-        if bpy.ops.object.mode_set.poll():
+    def clear_scene(self, existing_data):
+        """Safely removes all objects and collections from the current scene.
+        Unused meshes and materials are freed unless they are in existing_data, the data from before the batch
+        """
+        active = bpy.context.active_object
+        if active and active.mode != 'OBJECT' and bpy.ops.object.mode_set.poll():
             bpy.ops.object.mode_set(mode='OBJECT')
         
-        bpy.ops.object.select_all(action='SELECT')
-        if bpy.context.selected_objects:
-            bpy.ops.object.delete()
+        # Remove objects directly instead of select_all + delete operators
+        bpy.data.batch_remove(ids=list(bpy.context.scene.objects))
 
-        for collection in bpy.data.collections:
-            if collection.name != "Scene Collection":
-                bpy.data.collections.remove(collection)
-    
-    def process_p3d_files_in_directory(self, directory, settings):
-        """Finds and processes all .p3d files in a given directory."""
-        p3d_files = []
+        # The scene's master collection is not part of bpy.data.collections
+        bpy.data.batch_remove(ids=list(bpy.data.collections))
         
-        if settings.recursive_search:
-            # Recursive search
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    if file.lower().endswith(".p3d"):
-                        p3d_files.append(os.path.join(root, file))
-        else:
-            # Non-recursive search
-            try:
-                files = os.listdir(directory)
-                for file in files:
-                    if file.lower().endswith(".p3d"):
-                        filepath = os.path.join(directory, file)
-                        if os.path.isfile(filepath):
-                            p3d_files.append(filepath)
-            except OSError as e:
-                self.report({'ERROR'}, f"Error reading directory: {e}")
-                return 0
-
+        # Free data left behind by the previous file's objects
+        orphans = [mesh for mesh in bpy.data.meshes if mesh.users == 0 and mesh not in existing_data]
+        orphans += [mat for mat in bpy.data.materials if mat.users == 0 and mat not in existing_data]
+        if orphans:
+            bpy.data.batch_remove(ids=orphans)
+    
+    def process_p3d_files(self, p3d_files, settings):
+        """Processes the given .p3d files."""
         if not p3d_files:
             return 0
 
-        print(f"Found {len(p3d_files)} .p3d file(s) to process...")
+        logger.info("Found %d .p3d file(s) to process...", len(p3d_files))
+
+        # Only data created by the imports is freed between files
+        existing_data = set(bpy.data.meshes) | set(bpy.data.materials)
 
         processed_count = 0
         for filepath in p3d_files:
-            if self.process_single_p3d(filepath, settings):
+            if self.process_single_p3d(filepath, settings, existing_data):
                 processed_count += 1
         
-        print(f"\n--- {processed_count} files processed successfully! ---")
+        logger.info("\n--- %d files processed successfully! ---", processed_count)
         return processed_count
     
-    def process_single_p3d(self, filepath, settings):
+    def process_single_p3d(self, filepath, settings, existing_data):
         """Imports, modifies, and re-exports a single .p3d file."""
-        print(f"\n--- Processing: {os.path.basename(filepath)} ---")
+        logger.debug("\n--- Processing: %s ---", os.path.basename(filepath))
 
-        self.clear_scene()
+        self.clear_scene(existing_data)
 
         try:
             bpy.ops.a3ob.import_p3d(filepath=filepath)
-            print(f"  > Imported: {os.path.basename(filepath)}")
+            logger.debug("  > Imported: %s", os.path.basename(filepath))
         except Exception as e:
-            print(f"  ! ERROR: Failed to import {filepath}. Skipping. Reason: {e}")
+            logger.error("  ! ERROR: Failed to import %s. Skipping. Reason: %s", filepath, e)
             return False
 
         main_collection_name = os.path.basename(filepath)
         main_collection = bpy.data.collections.get(main_collection_name)
 
         if not main_collection:
-            print(f"  ! ERROR: Could not find main collection '{main_collection_name}'. Skipping.")
+            logger.error("  ! ERROR: Could not find main collection '%s'. Skipping.", main_collection_name)
             return False
 
         visuals_collection = next((coll for coll in main_collection.children if coll.name == "Visuals"), None)
 
         if not visuals_collection:
-            print("  - WARNING: No 'Visuals' collection found. Properties will not be changed.")
+            logger.warning("  - WARNING: No 'Visuals' collection found. Properties will not be changed.")
             return False
         
         resolution_lods = [obj for obj in visuals_collection.objects if obj.type == 'MESH']
         if not resolution_lods:
-            print("  - No meshes found in 'Visuals' collection to modify.")
+            logger.warning("  - No meshes found in 'Visuals' collection to modify.")
             return False
         
+        # Read the settings once instead of per LOD, skipping empty property names
+        prop_items = [(prop_item.name, prop_item.value) for prop_item in settings.named_properties if prop_item.name]
+        
         modified_count = 0
         for lod_mesh in resolution_lods:
+            properties = lod_mesh.a3ob_properties_object.properties
+            
+            # Ensure properties collection exists
+            if prop_items and not properties:
+                properties.add()
+            
+            # Indices rather than items, since add() may reallocate the collection;
+            # the first property of a duplicated name is the one updated
+            index_by_name = {}
+            for i, existing in enumerate(properties):
+                index_by_name.setdefault(existing.name, i)
+            
             # Add each named property from settings
-            for prop_item in settings.named_properties:
-                if not prop_item.name:  # Skip empty property names
-                    continue
-                
-                # Ensure properties collection exists
-                if not lod_mesh.a3ob_properties_object.properties:
-                    lod_mesh.a3ob_properties_object.properties.add()
-                
+            for name, value in prop_items:
                 # Find existing property or add new one
-                existing_prop = None
-                for existing in lod_mesh.a3ob_properties_object.properties:
-                    if existing.name == prop_item.name:
-                        existing_prop = existing
-                        break
-                
-                if existing_prop:
-                    existing_prop.value = prop_item.value
-                    print(f"    > Updated property '{prop_item.name}' = '{prop_item.value}'")
+                index = index_by_name.get(name)
+                if index is not None:
+                    properties[index].value = value
+                    logger.debug("    > Updated property '%s' = '%s'", name, value)
                 else:
-                    new_prop = lod_mesh.a3ob_properties_object.properties.add()
-                    new_prop.name = prop_item.name
-                    new_prop.value = prop_item.value
-                    print(f"    > Added property '{prop_item.name}' = '{prop_item.value}'")
+                    new_prop = properties.add()
+                    new_prop.name = name
+                    new_prop.value = value
+                    index_by_name[name] = len(properties) - 1
+                    logger.debug("    > Added property '%s' = '%s'", name, value)
             
             modified_count += 1
         
-        print(f"  > Modified properties for {modified_count} Resolution LOD(s).")
+        logger.debug("  > Modified properties for %d Resolution LOD(s).", modified_count)
 
         # Select objects for export
         bpy.ops.object.select_all(action='DESELECT')
@@ -255,13 +283,13 @@ class DAYZ_OT_ProcessBatchProperties(bpy.types.Operator):
         if bpy.context.selected_objects:
             try:
                 bpy.ops.a3ob.export_p3d(filepath=filepath, use_selection=True)
-                print(f"  > Successfully exported to: {filepath}")
+                logger.debug("  > Successfully exported to: %s", filepath)
                 return True
             except Exception as e:
-                print(f"  ! ERROR: Failed to export {filepath}. Reason: {e}")
+                logger.error("  ! ERROR: Failed to export %s. Reason: %s", filepath, e)
                 return False
         else:
-            print(f"  ! ERROR: No objects were selected for export from '{main_collection_name}'.")
+            logger.error("  ! ERROR: No objects were selected for export from '%s'.", main_collection_name)
             return False
 
 # Classes to register
@@ -274,10 +302,11 @@ batch_properties_classes = (
     DAYZ_OT_ProcessBatchProperties,
 )
 
+_register_batch_properties_classes, _unregister_batch_properties_classes = bpy.utils.register_classes_factory(batch_properties_classes)
+
 def register_batch_properties():
     """Register batch properties classes"""
-    for cls in batch_properties_classes:
-        bpy.utils.register_class(cls)
+    _register_batch_properties_classes()
     
     bpy.types.Scene.dayz_batch_properties_settings = bpy.props.PointerProperty(type=DAYZ_BatchPropertiesSettings)
 
@@ -286,8 +315,4 @@ def unregister_batch_properties():
     if hasattr(bpy.types.Scene, 'dayz_batch_properties_settings'):
         del bpy.types.Scene.dayz_batch_properties_settings
     
-    for cls in reversed(batch_properties_classes):
-        try:
-            bpy.utils.unregister_class(cls)
-        except RuntimeError:
-            pass  # Class wasn't registered
\ No newline at end of file
+    _unregister_batch_properties_classes()
\ No newline at end of file
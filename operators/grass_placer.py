@@ -4,13 +4,172 @@ Automates placing grass meshes onto target surfaces with normal alignment
 """
 
 import bpy
-import bmesh
-import random
+import math
 import time
-from mathutils import Vector, Matrix
-from mathutils.bvhtree import BVHTree
-from math import radians, sqrt
-# import numpy as np
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from mathutils import Matrix
+import numpy as np
+
+# Sampling data of evaluated target meshes as (name, surface), keyed by object
+# pointer; shared by the area and sampling passes of one run and released after
+# it, and dropped earlier when the target's geometry changes or on undo
+_target_surfaces = {}
+
+@bpy.app.handlers.persistent
+def invalidate_target_surfaces(scene, depsgraph):
+    """Drop cached surfaces of targets whose evaluated geometry changed"""
+    if not _target_surfaces:
+        return
+    for update in depsgraph.updates:
+        if update.is_updated_geometry and isinstance(update.id, bpy.types.Object):
+            _target_surfaces.pop(update.id.original.as_pointer(), None)
+
+@bpy.app.handlers.persistent
+def clear_target_surfaces(*args):
+    """Drop all cached target surfaces"""
+    _target_surfaces.clear()
+
+# Generic attribute types copied into merged meshes, with their foreach_get field,
+# component count and array type; other types are left out of merged meshes
+_ATTRIBUTE_LAYOUTS = {
+    'FLOAT': ('value', 1, np.float32),
+    'INT': ('value', 1, np.int32),
+    'INT8': ('value', 1, np.int32),
+    'BOOLEAN': ('value', 1, bool),
+    'FLOAT2': ('vector', 2, np.float32),
+    'INT32_2D': ('value', 2, np.int32),
+    'FLOAT_VECTOR': ('vector', 3, np.float32),
+    'FLOAT_COLOR': ('color', 4, np.float32),
+    'BYTE_COLOR': ('color', 4, np.float32),
+    'QUATERNION': ('value', 4, np.float32),
+}
+
+# Attributes merged meshes write explicitly
+_BUILT_ATTRIBUTES = {'position', 'material_index'}
+
+# Placement sampling; pure NumPy so it can run in worker threads without touching bpy
+def sample_placements(surface, matrix_world, rotation, grass_cdf, grass_scales, sampling, total_count_for_this_object, rng):
+    """Sample grass placements on a single target's surface
+    Returns (N, 4, 4) world matrices and the grass variant index of each placement
+    """
+    
+    tri_verts, face_cross, face_areas, area_cdf = surface
+    v0, v1, v2 = tri_verts[:, 0], tri_verts[:, 1], tri_verts[:, 2]
+    total_area = area_cdf[-1]
+    if total_area == 0:
+        return no_placements()
+    
+    n = total_count_for_this_object
+    
+    # Select random faces weighted by area; the cumulative areas stay in double
+    # precision so large terrains keep their small faces, the rest is float32 like Blender's data
+    face_idx = np.searchsorted(area_cdf, rng.random(n) * total_area, side='right')
+    np.minimum(face_idx, len(area_cdf) - 1, out=face_idx)
+    
+    # Random points on the faces using folded barycentric coordinates
+    r1, r2 = rng.random((2, n), dtype=np.float32)
+    fold = r1 + r2 > 1
+    r1[fold] = 1 - r1[fold]
+    r2[fold] = 1 - r2[fold]
+    
+    # Apply clumping by biasing points toward their face centers; the center
+    # is (1/3, 1/3, 1/3) in barycentric terms, so bias the weights directly
+    if sampling['clumping_factor'] > 0:
+        t = sampling['clumping_factor'] * rng.random(n, dtype=np.float32)
+        r1 += (1 / 3 - r1) * t
+        r2 += (1 / 3 - r2) * t
+    
+    r3 = 1 - r1 - r2
+    points = (r1[:, None] * v0[face_idx]
+              + r2[:, None] * v1[face_idx]
+              + r3[:, None] * v2[face_idx])
+    
+    # Transform to world space
+    points_world = points @ matrix_world[:3, :3].T + matrix_world[:3, 3]
+    
+    # Get surface normals; a triangle's normal is its normalized edge cross product,
+    # and only the object's rotation is applied to it
+    normals = face_cross[face_idx] / (2 * face_areas[face_idx])[:, None]
+    normals_world = normals @ rotation.T
+    normals_world /= np.linalg.norm(normals_world, axis=1)[:, None]
+    
+    # Apply surface offset
+    if sampling['surface_offset'] != 0:
+        points_world += normals_world * sampling['surface_offset']
+    
+    # Draw the per-instance random choices up front
+    grass_idx = np.searchsorted(grass_cdf, rng.random(n) * grass_cdf[-1], side='right')
+    np.minimum(grass_idx, len(grass_cdf) - 1, out=grass_idx)
+    angles = rng.random(n, dtype=np.float32) * (2 * math.pi) if sampling['random_rotation'] else None
+    scale_min, scale_max = sampling['scale_min'], sampling['scale_max']
+    scales = scale_min + (scale_max - scale_min) * rng.random(n, dtype=np.float32) if scale_min != scale_max else None
+    
+    # Orientations aligning each instance's Z axis with its surface normal
+    rotations = rotations_from_normals(normals_world, angles)
+    
+    # Without a scale range, instances keep their grass object's scale
+    if scales is not None:
+        scale_vectors = np.repeat(scales[:, None], 3, axis=1)
+    else:
+        scale_vectors = grass_scales[grass_idx]
+    
+    # Full world matrices, so each instance takes a single transform write
+    matrices = compose_matrices(points_world, rotations, scale_vectors)
+    
+    return matrices, grass_idx
+
+def no_placements():
+    """Empty placement arrays for targets without usable surface"""
+    return np.empty((0, 4, 4), dtype=np.float32), np.empty(0, dtype=np.intp)
+
+def rotations_from_normals(normals, angles):
+    """Quaternions (w, x, y, z) rotating Z onto each normal, optionally spun around it"""
+    # Shortest-arc rotation from Z: (1 + z.n, z x n), normalized
+    rotations = np.empty((len(normals), 4), dtype=np.float32)
+    rotations[:, 0] = 1 + normals[:, 2]
+    rotations[:, 1] = -normals[:, 1]
+    rotations[:, 2] = normals[:, 0]
+    rotations[:, 3] = 0
+    
+    # Normals pointing straight down have no unique arc; flip around X
+    flipped = rotations[:, 0] < 1e-6
+    rotations[flipped] = (0, 1, 0, 0)
+    rotations /= np.linalg.norm(rotations, axis=1)[:, None]
+    
+    # Apply random rotation around normal if enabled
+    if angles is not None:
+        half = angles * 0.5
+        sin_half = np.sin(half)
+        w1 = np.cos(half)
+        x1, y1, z1 = (normals * sin_half[:, None]).T
+        w2, x2, y2, z2 = rotations.T.copy()
+        rotations[:, 0] = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
+        rotations[:, 1] = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
+        rotations[:, 2] = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
+        rotations[:, 3] = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
+    
+    return rotations
+
+def compose_matrices(locations, rotations, scales):
+    """4x4 matrices combining location, quaternion (w, x, y, z) rotation and scale"""
+    w, x, y, z = rotations.T
+    matrices = np.zeros((len(locations), 4, 4), dtype=np.float32)
+    matrices[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    matrices[:, 0, 1] = 2 * (x * y - w * z)
+    matrices[:, 0, 2] = 2 * (x * z + w * y)
+    matrices[:, 1, 0] = 2 * (x * y + w * z)
+    matrices[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    matrices[:, 1, 2] = 2 * (y * z - w * x)
+    matrices[:, 2, 0] = 2 * (x * z - w * y)
+    matrices[:, 2, 1] = 2 * (y * z + w * x)
+    matrices[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    
+    # Scale each rotated axis (column), then add the translation
+    matrices[:, :3, :3] *= scales[:, None, :]
+    matrices[:, :3, 3] = locations
+    matrices[:, 3, 3] = 1
+    return matrices
 
 # Property Groups
 class DAYZ_TargetObject(bpy.types.PropertyGroup):
@@ -134,6 +293,12 @@ class DAYZ_GrassPlacerSettings(bpy.types.PropertyGroup):
         default=True
     )
     
+    share_mesh_data: bpy.props.BoolProperty(
+        name="Share Mesh Data",
+        description="Link instances to the grass mesh instead of copying it for every instance",
+        default=True
+    )
+    
     # Merge options
     merge_all_grass: bpy.props.BoolProperty(
         name="Merge Per Target",
@@ -319,60 +484,96 @@ class DAYZ_OT_GenerateGrass(bpy.types.Operator):
             self.report({'ERROR'}, "No valid grass objects with weight > 0")
             return {'CANCELLED'}
         
-        # Set random seed
-        random.seed(settings.distribution_seed)
-        
-        # Create weighted grass selection
-        total_weight = sum(g.weight for g in valid_grass)
-        if total_weight == 0:
+        # Create weighted grass selection as a cumulative weight table
+        grass_objs = [g.obj for g in valid_grass]
+        grass_cdf = np.cumsum([g.weight for g in valid_grass], dtype=np.float64)
+        if grass_cdf[-1] == 0:
             self.report({'ERROR'}, "Total grass weight is 0")
             return {'CANCELLED'}
         
         # Generate grass
         all_grass_instances = []
-        grass_by_variant = {}  # For merge by variant option
         grass_counts = {}
         total_area = 0
+        total_placed = 0
         
         total_count_per_object = settings.total_count
         merged_objects = []  # Track merged objects for per-target merging
         
-        for target_ref in settings.target_objects:
-            target_obj = target_ref.obj
-            if not target_obj or target_obj.type != 'MESH':
-                continue
-            
-            mesh_area = self.calculate_mesh_area(target_obj)
-            total_area += mesh_area
-            
-            if settings.use_density_mode:
-                total_count_for_this_object = int(mesh_area * settings.density)
-            else:
-                total_count_for_this_object = total_count_per_object
-            
-            grass_instances, counts = self.generate_on_object(context, target_obj, valid_grass, total_weight, settings, total_count_for_this_object)
-            all_grass_instances.extend(grass_instances)
-            
-            for name, count in counts.items():
-                grass_counts[name] = grass_counts.get(name, 0) + count
+        # Merge modes write merged meshes directly, so grass mesh data is read once up front
+        if settings.merge_all_grass or settings.merge_by_variant:
+            templates = [self.read_grass_template(obj) for obj in grass_objs]
+        
+        # Settings read once for the sampling workers, which must not touch bpy
+        sampling = {
+            'clumping_factor': settings.clumping_factor,
+            'surface_offset': settings.surface_offset,
+            'random_rotation': settings.random_rotation,
+            'scale_min': settings.scale_min,
+            'scale_max': settings.scale_max,
+        }
+        grass_scales = np.array([obj.scale[:] for obj in grass_objs], dtype=np.float32)
+        
+        # Target meshes are read on the main thread, the NumPy sampling runs in worker
+        # threads, and the results are written back to Blender in target order
+        with ThreadPoolExecutor() as pool:
+            jobs = []
+            for target_ref in settings.target_objects:
+                target_obj = target_ref.obj
+                if not target_obj or target_obj.type != 'MESH':
+                    continue
+                
+                mesh_area = self.calculate_mesh_area(context, target_obj)
+                total_area += mesh_area
+                
+                if settings.use_density_mode:
+                    total_count_for_this_object = int(mesh_area * settings.density)
+                else:
+                    total_count_for_this_object = total_count_per_object
+                
+                surface = self.get_target_surface(context, target_obj)
+                if surface is None:
+                    continue
+                
+                # Seed per target, so a target's grass does not depend on the other targets
+                rng = np.random.default_rng((settings.distribution_seed, zlib.crc32(target_obj.name.encode())))
+                
+                matrix_world = np.array(target_obj.matrix_world, dtype=np.float32)
+                rotation = np.array(target_obj.matrix_world.to_quaternion().to_matrix(), dtype=np.float32)
+                jobs.append((target_obj, pool.submit(
+                    sample_placements, surface, matrix_world, rotation,
+                    grass_cdf, grass_scales, sampling, total_count_for_this_object, rng,
+                )))
             
-            # Handle merge per target object
-            if settings.merge_all_grass and grass_instances:
-                merged_name = self.generate_grass_name_from_target(target_obj.name)
-                merged_obj = self.merge_all_objects(context, grass_instances, merged_name)
-                if merged_obj:
-                    merged_objects.append(merged_obj)
+            # Every surface is handed to its job, so large terrains are not held after this run
+            _target_surfaces.clear()
             
-            # Group by variant for merge option (per target)
-            elif settings.merge_by_variant and grass_instances:
-                target_grass_by_variant = {}
-                for grass_instance in grass_instances:
-                    original_name = self.get_original_grass_name(grass_instance, valid_grass)
-                    if original_name not in target_grass_by_variant:
-                        target_grass_by_variant[original_name] = []
-                    target_grass_by_variant[original_name].append(grass_instance)
+            for target_obj, job in jobs:
+                matrices, grass_idx = job.result()
+                if not len(grass_idx):
+                    continue
+                total_placed += len(grass_idx)
+                
+                for grass_obj, count in zip(grass_objs, np.bincount(grass_idx, minlength=len(grass_objs))):
+                    if count:
+                        grass_counts[grass_obj.name] = grass_counts.get(grass_obj.name, 0) + int(count)
+                
+                grass_name = self.generate_grass_name_from_target(target_obj.name)
+                
+                # Handle merge per target object
+                if settings.merge_all_grass:
+                    merged_objects.append(self.build_merged_object(context, grass_name, templates, matrices, grass_idx))
+                
+                # Merge by variant (per target)
+                elif settings.merge_by_variant:
+                    for variant, placements in self.group_by_variant(grass_idx):
+                        self.build_merged_object(
+                            context, f"{grass_name}_{grass_objs[variant].name}", templates,
+                            matrices[placements], grass_idx[placements],
+                        )
                 
-                self.merge_by_variants_per_target(context, target_grass_by_variant, target_obj.name)
+                else:
+                    all_grass_instances.extend(self.create_grass_instances(context, grass_objs, matrices, grass_idx, settings))
         
         # Handle organization for non-merged grass
         if not settings.merge_all_grass and not settings.merge_by_variant and settings.parent_to_empty and all_grass_instances:
@@ -394,11 +595,11 @@ class DAYZ_OT_GenerateGrass(bpy.types.Operator):
         if settings.merge_all_grass:
             report_message = f"Generated and merged grass for {len(merged_objects)} target objects in {elapsed_time:.2f} seconds"
         else:
-            report_message = f"Generated {len(all_grass_instances)} grass instances in {elapsed_time:.2f} seconds"
+            report_message = f"Generated {total_placed} grass instances in {elapsed_time:.2f} seconds"
         self.report({'INFO'}, report_message)
         
         if total_area > 0:
-            actual_density = len(all_grass_instances) / total_area
+            actual_density = total_placed / total_area
             self.report({'INFO'}, f"    Actual Density: {actual_density:.2f} grass/unitÂ²")
         
         if grass_counts:
@@ -421,227 +622,301 @@ class DAYZ_OT_GenerateGrass(bpy.types.Operator):
         # For other naming patterns, just prefix with "grass_"
         return f"grass_{target_name}"
     
-    def calculate_mesh_area(self, obj):
+    def calculate_mesh_area(self, context, obj):
         """Calculates the total surface area of a mesh object."""
         if obj.type != 'MESH' or not obj.data:
             return 0.0
         
-        # Ensure we have the latest data
-        depsgraph = bpy.context.evaluated_depsgraph_get()
-        eval_obj = obj.evaluated_get(depsgraph)
-        
-        mesh = eval_obj.to_mesh()
-        
-        bm = bmesh.new()
-        bm.from_mesh(mesh)
-        
-        area = sum(f.calc_area() for f in bm.faces)
-        
-        bm.free()
-        eval_obj.to_mesh_clear()
-        
-        return area
+        # Shares the evaluated surface sample_placements samples from
+        surface = self.get_target_surface(context, obj)
+        if surface is None:
+            return 0.0
+        return float(surface[3][-1])
     
-    def generate_on_object(self, context, target_obj, valid_grass, total_weight, settings, total_count_for_this_object):
-        """Generate grass on a single target object"""
+    def get_target_surface(self, context, target_obj):
+        """Triangle corners, edge cross products, areas and cumulative areas of a target's evaluated mesh
+        Cached per target until its geometry changes; None if the mesh has no triangles
+        """
+        # A freed object's address can be reused by another one, so the name must match too
+        key = target_obj.as_pointer()
+        cached = _target_surfaces.get(key)
+        if cached is not None and cached[0] == target_obj.name:
+            return cached[1]
         
         # Get mesh data with modifiers applied
         depsgraph = context.evaluated_depsgraph_get()
         target_eval = target_obj.evaluated_get(depsgraph)
         mesh = target_eval.to_mesh()
         
-        # Create bmesh for face sampling
-        bm = bmesh.new()
-        bm.from_mesh(mesh)
-        bmesh.ops.triangulate(bm, faces=bm.faces)
-        
-        # Calculate face areas for weighted sampling
-        face_areas = [face.calc_area() for face in bm.faces]
-        total_area = sum(face_areas)
-        
-        if total_area == 0:
-            bm.free()
-            target_eval.to_mesh_clear()
-            return [], {}
-        
-        grass_instances = []
-        counts = {}
-        
-        for i in range(total_count_for_this_object):
-            # Select random face weighted by area
-            face = self.select_weighted_face(bm.faces, face_areas, total_area)
-            if not face:
-                continue
-            
-            # Get random point on face
-            point_local = self.random_point_on_face(face)
-            
-            # Apply clumping if needed
-            if settings.clumping_factor > 0:
-                point_local = self.apply_clumping(point_local, face, settings.clumping_factor)
+        # Read the triangulated surface straight from the mesh
+        mesh.calc_loop_triangles()
+        tri_count = len(mesh.loop_triangles)
+        surface = None
+        if tri_count:
+            coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get('co', coords)
+            tri_indices = np.empty(tri_count * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get('vertices', tri_indices)
             
-            # Transform to world space
-            point_world = target_obj.matrix_world @ point_local
+            # Triangle corners as an (F, 3, 3) array for vectorized sampling
+            tri_verts = coords.reshape(-1, 3)[tri_indices].reshape(-1, 3, 3)
             
-            # Get surface normal
-            normal_local = face.normal
-            normal_world = target_obj.matrix_world.to_quaternion() @ normal_local
-            normal_world.normalize()
-            
-            # Apply surface offset
-            if settings.surface_offset != 0:
-                point_world += normal_world * settings.surface_offset
-            
-            # Select grass object based on weight
-            grass_obj = self.select_weighted_grass(valid_grass, total_weight)
-            if not grass_obj:
-                continue
-            
-            counts[grass_obj.name] = counts.get(grass_obj.name, 0) + 1
-            
-            # Create grass instance
-            grass_instance = self.create_grass_instance(context, grass_obj, point_world, normal_world, settings)
-            if grass_instance:
-                grass_instances.append(grass_instance)
+            # Calculate face areas for weighted sampling
+            v0, v1, v2 = tri_verts[:, 0], tri_verts[:, 1], tri_verts[:, 2]
+            face_cross = np.cross(v1 - v0, v2 - v0)
+            face_areas = 0.5 * np.linalg.norm(face_cross, axis=1)
+            area_cdf = np.cumsum(face_areas, dtype=np.float64)
+            surface = (tri_verts, face_cross, face_areas, area_cdf)
         
-        # Cleanup
-        bm.free()
         target_eval.to_mesh_clear()
         
-        return grass_instances, counts
+        _target_surfaces[key] = (target_obj.name, surface)
+        return surface
     
-    def select_weighted_face(self, faces, face_areas, total_area):
-        """Select a face weighted by area"""
-        if not faces or total_area == 0:
-            return None
-        
-        rand_val = random.uniform(0, total_area)
-        current_area = 0
-        
-        for i, face in enumerate(faces):
-            current_area += face_areas[i]
-            if rand_val <= current_area:
-                return face
-        
-        return faces[-1]  # fallback
+    def create_grass_instances(self, context, grass_objs, matrices, grass_idx, settings):
+        """Create one grass object per placement and link them into the active collection"""
+        grass_instances = [
+            self.create_grass_instance(context, grass_objs[variant], Matrix(matrix), settings)
+            for variant, matrix in zip(grass_idx, matrices)
+        ]
+        
+        # Link all new instances in one pass once they are fully set up
+        link = context.collection.objects.link
+        for grass_instance in grass_instances:
+            link(grass_instance)
+        
+        return grass_instances
     
-    def random_point_on_face(self, face):
-        """Get random point on triangular face using barycentric coordinates"""
-        if len(face.verts) < 3:
-            return face.verts[0].co.copy()
+    def create_grass_instance(self, context, grass_obj, matrix, settings):
+        """Create a single grass instance; the caller links it into a collection"""
         
-        # Generate random barycentric coordinates
-        r1, r2 = random.random(), random.random()
-        if r1 + r2 > 1:
-            r1 = 1 - r1
-            r2 = 1 - r2
+        # Duplicate the object with its modifiers, material links and properties;
+        # the mesh itself is only duplicated when unique data is wanted
+        new_grass = grass_obj.copy()
+        if not settings.share_mesh_data:
+            new_grass.data = grass_obj.data.copy()
         
-        r3 = 1 - r1 - r2
+        # Position, orientation and scale in one write; quaternion mode avoids Euler decomposition
+        new_grass.rotation_mode = 'QUATERNION'
+        new_grass.matrix_world = matrix
         
-        # Interpolate position
-        v0, v1, v2 = face.verts[0].co, face.verts[1].co, face.verts[2].co
-        return r1 * v0 + r2 * v1 + r3 * v2
+        return new_grass
     
-    def apply_clumping(self, point, face, clump_factor):
-        """Apply clumping effect to point placement"""
-        if clump_factor <= 0:
-            return point
-        
-        # Simple clumping by biasing toward face center
-        face_center = face.calc_center_median()
-        return point.lerp(face_center, clump_factor * random.random())
+    def read_grass_template(self, grass_obj):
+        """Read a grass object's mesh into arrays for building merged meshes"""
+        mesh = grass_obj.data
+        vert_count, edge_count = len(mesh.vertices), len(mesh.edges)
+        loop_count, poly_count = len(mesh.loops), len(mesh.polygons)
+        
+        coords = np.empty(vert_count * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', coords)
+        edge_verts = np.empty(edge_count * 2, dtype=np.int32)
+        mesh.edges.foreach_get('vertices', edge_verts)
+        loop_verts = np.empty(loop_count, dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loop_verts)
+        loop_edges = np.empty(loop_count, dtype=np.int32)
+        mesh.loops.foreach_get('edge_index', loop_edges)
+        loop_starts = np.empty(poly_count, dtype=np.int32)
+        mesh.polygons.foreach_get('loop_start', loop_starts)
+        material_indices = np.empty(poly_count, dtype=np.int32)
+        mesh.polygons.foreach_get('material_index', material_indices)
+        
+        uvs = {}
+        for uv_layer in mesh.uv_layers:
+            uv = np.empty(loop_count * 2, dtype=np.float32)
+            uv_layer.data.foreach_get('uv', uv)
+            uvs[uv_layer.name] = uv.reshape(-1, 2)
+        
+        # Remaining generic attributes, such as smooth shading, sharp edges and colors,
+        # as (domain, data_type, values) with one values row per domain element
+        domain_sizes = {'POINT': vert_count, 'EDGE': edge_count, 'FACE': poly_count, 'CORNER': loop_count}
+        attributes = {}
+        for attribute in mesh.attributes:
+            name = attribute.name
+            layout = _ATTRIBUTE_LAYOUTS.get(attribute.data_type)
+            if (layout is None or attribute.domain not in domain_sizes or name.startswith('.')
+                    or name in _BUILT_ATTRIBUTES or name in uvs):
+                continue
+            field, width, dtype = layout
+            size = domain_sizes[attribute.domain]
+            values = np.empty(size * width, dtype=dtype)
+            attribute.data.foreach_get(field, values)
+            attributes[name] = (attribute.domain, attribute.data_type, values.reshape(size, width))
+        
+        return {
+            'object': grass_obj,
+            'coords': coords.reshape(-1, 3),
+            'edge_verts': edge_verts,
+            'loop_verts': loop_verts,
+            'loop_edges': loop_edges,
+            'loop_starts': loop_starts,
+            'material_indices': material_indices,
+            'materials': [slot.material for slot in grass_obj.material_slots],
+            'uvs': uvs,
+            'attributes': attributes,
+            'domain_sizes': domain_sizes,
+            # Vertex groups and custom split normals are not generic attributes
+            'needs_join': bool(grass_obj.vertex_groups) or mesh.has_custom_normals,
+        }
     
-    def select_weighted_grass(self, valid_grass, total_weight):
-        """Select grass object based on weight"""
-        rand_val = random.uniform(0, total_weight)
-        current_weight = 0
-        
-        for grass_item in valid_grass:
-            current_weight += grass_item.weight
-            if rand_val <= current_weight:
-                return grass_item.obj
-        
-        return valid_grass[-1].obj  # fallback
+    def group_by_variant(self, grass_idx):
+        """Yield each present variant with the indices of its placements, in variant order"""
+        order = np.argsort(grass_idx, kind='stable')
+        variants, starts = np.unique(grass_idx[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        for variant, start, end in zip(variants, starts, ends):
+            yield variant, order[start:end]
     
-    def create_grass_instance(self, context, grass_obj, location, normal, settings):
-        """Create a single grass instance"""
-        
-        # Duplicate grass object
-        new_grass = grass_obj.copy()
-        new_grass.data = grass_obj.data.copy()
-        context.collection.objects.link(new_grass)
-        
-        # Position
-        new_grass.location = location
-        
-        # Orientation - align Z-axis with normal
-        if normal.length > 0:
-            # Create rotation to align Z with normal
-            z_axis = Vector((0, 0, 1))
-            rotation_quat = z_axis.rotation_difference(normal)
+    def build_merged_object(self, context, merged_name, templates, matrices, grass_idx):
+        """Build one object holding every placement's grass mesh, transformed into world space"""
+        if any(templates[variant]['needs_join'] for variant in np.unique(grass_idx)):
+            return self.join_merged_object(context, merged_name, templates, matrices, grass_idx)
+        
+        materials = []
+        material_index = {}
+        uv_names = []
+        attribute_types = {}
+        coords, edge_verts, loop_verts, loop_edges, loop_starts, material_indices = [], [], [], [], [], []
+        uv_parts = []
+        attribute_parts = []
+        vert_offset = edge_offset = loop_offset = 0
+        
+        for variant, placements in self.group_by_variant(grass_idx):
+            template = templates[variant]
+            variant_matrices = matrices[placements]
+            count = len(variant_matrices)
+            vert_count = len(template['coords'])
+            edge_count = len(template['edge_verts']) // 2
+            loop_count = len(template['loop_verts'])
             
-            # Apply random rotation around normal if enabled
-            if settings.random_rotation:
-                import math
-                random_angle = random.uniform(0, 2 * math.pi)
-                random_quat = Matrix.Rotation(random_angle, 4, normal).to_quaternion()
-                rotation_quat = random_quat @ rotation_quat
+            # Transform the template's vertices by every placement at once
+            placed = template['coords'] @ variant_matrices[:, :3, :3].transpose(0, 2, 1)
+            placed += variant_matrices[:, None, :3, 3]
+            coords.append(placed.reshape(-1, 3))
             
-            new_grass.rotation_euler = rotation_quat.to_euler()
-        
-        # Random scale
-        if settings.scale_min != settings.scale_max:
-            scale = random.uniform(settings.scale_min, settings.scale_max)
-            new_grass.scale = (scale, scale, scale)
-        
-        return new_grass
-    
-    def merge_all_objects(self, context, objects_to_merge, merged_name):
-        """Merge all grass objects into a single object and return the merged object"""
-        if not objects_to_merge:
-            return None
-        
-        # Deselect all objects
-        bpy.ops.object.select_all(action='DESELECT')
-        
-        # Select all grass objects
-        for obj in objects_to_merge:
-            obj.select_set(True)
-        
-        # Set the first object as active
-        context.view_layer.objects.active = objects_to_merge[0]
-        
-        # Join all objects
-        bpy.ops.object.join()
-        
-        # Rename the merged object
-        merged_obj = context.view_layer.objects.active
+            # Repeat topology with each copy's indices shifted past the previous copies
+            vert_offsets = vert_offset + vert_count * np.arange(count)
+            edge_offsets = edge_offset + edge_count * np.arange(count)
+            loop_offsets = loop_offset + loop_count * np.arange(count)
+            edge_verts.append((template['edge_verts'] + vert_offsets[:, None]).ravel())
+            loop_verts.append((template['loop_verts'] + vert_offsets[:, None]).ravel())
+            loop_edges.append((template['loop_edges'] + edge_offsets[:, None]).ravel())
+            loop_starts.append((template['loop_starts'] + loop_offsets[:, None]).ravel())
+            
+            # Map this variant's material slots onto the merged mesh's materials
+            remap = []
+            for material in template['materials']:
+                if material not in material_index:
+                    material_index[material] = len(materials)
+                    materials.append(material)
+                remap.append(material_index[material])
+            if remap:
+                remap = np.array(remap, dtype=np.int32)
+                variant_materials = remap[np.minimum(template['material_indices'], len(remap) - 1)]
+            else:
+                variant_materials = template['material_indices']
+            material_indices.append(np.tile(variant_materials, count))
+            
+            for name in template['uvs']:
+                if name not in uv_names:
+                    uv_names.append(name)
+            uv_parts.append((template['uvs'], count, loop_count))
+            
+            # Attributes keep the domain and type of the first variant that has them
+            for name, attribute in template['attributes'].items():
+                attribute_types.setdefault(name, attribute[:2])
+            attribute_parts.append((template['attributes'], template['domain_sizes'], count))
+            
+            vert_offset += vert_count * count
+            edge_offset += edge_count * count
+            loop_offset += loop_count * count
+        
+        # Edges are copied from the templates, so edge attributes line up with them
+        mesh = bpy.data.meshes.new(merged_name)
+        mesh.vertices.add(vert_offset)
+        mesh.edges.add(edge_offset)
+        mesh.loops.add(loop_offset)
+        mesh.polygons.add(sum(len(starts) for starts in loop_starts))
+        mesh.vertices.foreach_set('co', np.concatenate(coords).astype(np.float32, copy=False).ravel())
+        mesh.edges.foreach_set('vertices', np.concatenate(edge_verts))
+        mesh.loops.foreach_set('vertex_index', np.concatenate(loop_verts))
+        mesh.loops.foreach_set('edge_index', np.concatenate(loop_edges))
+        mesh.polygons.foreach_set('loop_start', np.concatenate(loop_starts))
+        mesh.polygons.foreach_set('material_index', np.concatenate(material_indices))
+        
+        # UV layers are matched by name; variants without a layer get zeroed UVs
+        for name in uv_names:
+            uv = np.concatenate([
+                np.tile(uvs[name], (count, 1)) if name in uvs else np.zeros((loop_count * count, 2), dtype=np.float32)
+                for uvs, count, loop_count in uv_parts
+            ])
+            mesh.uv_layers.new(name=name).data.foreach_set('uv', uv.ravel())
+        
+        # Generic attributes are matched by name, domain and type; variants without them get zeros
+        for name, (domain, data_type) in attribute_types.items():
+            if name in mesh.attributes:
+                continue
+            field, width, dtype = _ATTRIBUTE_LAYOUTS[data_type]
+            values = np.concatenate([
+                np.tile(attributes[name][2], (count, 1))
+                if attributes.get(name, (None, None))[:2] == (domain, data_type)
+                else np.zeros((domain_sizes[domain] * count, width), dtype=dtype)
+                for attributes, domain_sizes, count in attribute_parts
+            ])
+            mesh.attributes.new(name, data_type, domain).data.foreach_set(field, values.ravel())
+        
+        for material in materials:
+            mesh.materials.append(material)
+        
+        mesh.update()
+        
+        # A copy of the first placement's grass object, like join_merged_object gives,
+        # so object properties such as the P3D LOD settings carry over
+        merged_obj = templates[grass_idx[0]]['object'].copy()
         merged_obj.name = merged_name
-        
+        merged_obj.data = mesh
+        merged_obj.modifiers.clear()
+        merged_obj.parent = None
+        merged_obj.matrix_world = Matrix.Identity(4)
+        context.collection.objects.link(merged_obj)
         return merged_obj
     
-    def merge_by_variants_per_target(self, context, grass_by_variant, target_name):
-        """Merge grass objects by variant type for a specific target"""
-        for variant_name, objects in grass_by_variant.items():
-            if len(objects) > 1:
-                merged_name = f"{self.generate_grass_name_from_target(target_name)}_{variant_name}"
-                self.merge_all_objects(context, objects, merged_name)
-    
-    def get_original_grass_name(self, grass_instance, valid_grass):
-        """Get the name of the original grass object this instance came from"""
-        instance_data_name = grass_instance.data.name
-        
-        # Try to match with original grass objects
-        for grass_item in valid_grass:
-            if grass_item.obj and grass_item.obj.data.name in instance_data_name:
-                return grass_item.obj.name
-        
-        # Fallback: try to clean up common Blender suffixes
-        clean_name = instance_data_name
-        for suffix in ['.001', '.002', '.003', '.004', '.005', '.006', '.007', '.008', '.009']:
-            clean_name = clean_name.replace(suffix, '')
-        
-        return clean_name
+    def join_merged_object(self, context, merged_name, templates, matrices, grass_idx):
+        """Build a merged object by joining placed copies of the grass objects
+        Used for grass with vertex groups or custom split normals, which build_merged_object does not carry
+        """
+        parts = []
+        for variant, matrix in zip(grass_idx, matrices):
+            part = templates[variant]['object'].copy()
+            part.parent = None
+            part.matrix_world = Matrix(matrix)
+            parts.append(part)
+        
+        # The first part receives the others, so only it needs its own mesh
+        merged_obj = parts[0]
+        merged_obj.name = merged_name
+        merged_obj.data = merged_obj.data.copy()
+        merged_obj.data.name = merged_name
+        merged_obj.modifiers.clear()
+        
+        link = context.collection.objects.link
+        for part in parts:
+            link(part)
+        
+        # World matrices of freshly placed parts are only valid after an update
+        context.view_layer.update()
+        with context.temp_override(
+            active_object=merged_obj,
+            object=merged_obj,
+            selected_objects=parts,
+            selected_editable_objects=parts,
+        ):
+            bpy.ops.object.join()
+        
+        # Keep the merged geometry in world space, like the meshes built from arrays
+        merged_obj.data.transform(merged_obj.matrix_world)
+        merged_obj.matrix_world = Matrix.Identity(4)
+        return merged_obj
 
 # Classes to register
 grass_classes = (
@@ -659,20 +934,34 @@ grass_classes = (
     DAYZ_OT_GenerateGrass,
 )
 
+_register_grass_classes, _unregister_grass_classes = bpy.utils.register_classes_factory(grass_classes)
+
+def _clear_surface_handlers():
+    """Handlers after which no cached target surface can be trusted"""
+    app_handlers = bpy.app.handlers
+    return (app_handlers.frame_change_post, app_handlers.load_post,
+            app_handlers.undo_post, app_handlers.redo_post)
+
 def register_grass_placer():
     """Register grass placer classes"""
-    for cls in grass_classes:
-        bpy.utils.register_class(cls)
+    _register_grass_classes()
     
     bpy.types.Scene.dayz_grass_placer_settings = bpy.props.PointerProperty(type=DAYZ_GrassPlacerSettings)
+    
+    bpy.app.handlers.depsgraph_update_post.append(invalidate_target_surfaces)
+    for handlers in _clear_surface_handlers():
+        handlers.append(clear_target_surfaces)
 
 def unregister_grass_placer():
     """Unregister grass placer classes"""
+    if invalidate_target_surfaces in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(invalidate_target_surfaces)
+    for handlers in _clear_surface_handlers():
+        if clear_target_surfaces in handlers:
+            handlers.remove(clear_target_surfaces)
+    _target_surfaces.clear()
+    
     if hasattr(bpy.types.Scene, 'dayz_grass_placer_settings'):
         del bpy.types.Scene.dayz_grass_placer_settings
     
-    for cls in reversed(grass_classes):
-        try:
-            bpy.utils.unregister_class(cls)
-        except RuntimeError:
-            pass  # Class wasn't registered
\ No newline at end of file
+    _unregister_grass_classes()
\ No newline at end of file
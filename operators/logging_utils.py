@@ -0,0 +1,19 @@
+"""
+Logging helpers for DayZ Asset Tools operators
+"""
+
+import logging
+import sys
+
+def get_console_logger(name):
+    """
+    Logger printing bare messages to the system console
+    Operators set its level from their verbose option, so detailed output is skipped by default
+    """
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(console_handler)
+        logger.propagate = False
+    return logger
@@ -4,8 +4,120 @@ Removes empty UV maps from selected objects while preserving at least one UV map
 """
 
 import bpy
-import bmesh
-from mathutils import Vector
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .logging_utils import get_console_logger
+
+# Per-map analysis goes to the console only when verbose output is enabled
+logger = get_console_logger(__name__)
+
+def analyze_all_uv_maps(uv_maps, loop_starts, loop_totals, report_islands, count_unique):
+    """
+    Analyze every UV map of a mesh from the arrays of read_uv_data
+    Pure NumPy, so it can run outside the main thread
+    Returns dictionary of analysis data keyed by UV map name
+    """
+    # Each loop's successor within its face, wrapping around to the face's first loop
+    next_loops = np.arange(1, int(loop_totals.sum()) + 1)
+    if len(loop_starts):
+        next_loops[loop_starts + loop_totals - 1] = loop_starts
+    
+    analyses = {}
+    for uv_name, uvs in uv_maps.items():
+        analysis = analyze_uv_map(uv_name, uvs, loop_starts, loop_totals, next_loops, count_unique)
+    
+        # Estimate number of islands (simplified - counts disconnected UV coordinate groups)
+        # Only reported, never used to decide whether a map is empty
+        if report_islands and not analysis['all_at_origin']:
+            analysis['islands'] = estimate_uv_islands(uvs, loop_starts, loop_totals)
+        analyses[uv_name] = analysis
+    
+    return analyses
+
+def analyze_uv_map(uv_name, uvs, loop_starts, loop_totals, next_loops, count_unique):
+    """
+    Analyze a UV map and return detailed information
+    uvs: (loops, 2) array of the layer's UV coordinates
+    count_unique: count distinct coordinates, which is only reported in the verbose output
+    Returns dictionary with analysis data
+    """
+    min_area_threshold = 1e-6
+    
+    # Skip degenerate faces
+    valid = loop_totals >= 3
+    valid_uvs = uvs[np.repeat(valid, loop_totals)]
+    
+    analysis = {
+        'name': uv_name,
+        'total_faces': len(loop_starts),
+        'valid_faces': int(valid.sum()),
+        'total_points': len(valid_uvs),
+        'unique_points': -1,  # Not counted
+        'total_surface_area': 0.0,
+        'islands': -1,  # Not estimated
+        # Check if any UV coordinate is not at origin
+        'all_at_origin': not np.any(np.abs(valid_uvs) > 1e-6),
+        'is_empty': True
+    }
+    
+    if count_unique:
+        # Round for uniqueness check
+        analysis['unique_points'] = len(np.unique(quantize_uvs(valid_uvs, 1e8), axis=0))
+    
+    # A map with every coordinate at the origin is empty without measuring its area
+    if analysis['all_at_origin']:
+        return analysis
+    
+    # Shoelace area of every face at once, summing each face's loop terms
+    x, y = uvs.astype(np.float64).T
+    cross = x * y[next_loops] - x[next_loops] * y
+    face_areas = np.abs(np.add.reduceat(cross, loop_starts)) / 2.0
+    analysis['total_surface_area'] = float(face_areas[valid].sum())
+    
+    # Determine if UV map is considered empty
+    analysis['is_empty'] = analysis['total_surface_area'] < min_area_threshold
+    
+    return analysis
+
+def estimate_uv_islands(uvs, loop_starts, loop_totals):
+    """
+    Estimate the number of UV islands by analyzing connected UV coordinates
+    Faces sharing a UV coordinate are joined with a union-find over the coordinates
+    This is a simplified estimation
+    """
+    if not len(loop_starts):
+        return 0
+    
+    # Compact id per distinct rounded UV coordinate
+    uv_ids = np.unique(quantize_uvs(uvs, 1e6), axis=0, return_inverse=True)[1].ravel()
+    parent = list(range(uv_ids.max() + 1))
+    
+    def find(uv_id):
+        root = uv_id
+        while parent[root] != root:
+            root = parent[root]
+        # Path compression
+        while parent[uv_id] != root:
+            parent[uv_id], uv_id = root, parent[uv_id]
+        return root
+    
+    # Join every loop's coordinate with the first coordinate of its face
+    first_ids = uv_ids[np.repeat(loop_starts, loop_totals)]
+    for uv_id, first_id in zip(uv_ids.tolist(), first_ids.tolist()):
+        if uv_id != first_id:
+            root_a, root_b = find(uv_id), find(first_id)
+            if root_a != root_b:
+                parent[root_a] = root_b
+    
+    return len({find(uv_id) for uv_id in uv_ids[loop_starts].tolist()})
+
+def quantize_uvs(uvs, scale):
+    """
+    Round UV coordinates to multiples of 1 / scale as an (n, 2) int64 array
+    Rows are compared whole, so UDIM and other tiled coordinates far from 0-1 keep distinct keys
+    """
+    return np.round(uvs.astype(np.float64) * scale).astype(np.int64)
 
 class DAYZ_OT_CleanEmptyUVMaps(bpy.types.Operator):
     """Clean empty UV maps from selected objects"""
@@ -14,178 +126,63 @@ class DAYZ_OT_CleanEmptyUVMaps(bpy.types.Operator):
     bl_description = "Remove UV maps that are empty (all at 0,0) or have insignificant surface area while keeping at least one UV map per object"
     bl_options = {'REGISTER', 'UNDO'}
 
+    verbose: bpy.props.BoolProperty(
+        name="Verbose Output",
+        description="Print the analysis of every UV map to the system console",
+        default=False
+    )
+
+    report_islands: bpy.props.BoolProperty(
+        name="Report Islands",
+        description="Estimate the number of UV islands of every UV map for the verbose output",
+        default=False
+    )
+
     @classmethod
     def poll(cls, context):
         # Check if we have mesh objects selected
         return any(obj.type == 'MESH' for obj in context.selected_objects)
 
-    def analyze_uv_map(self, mesh, uv_layer):
-        """
-        Analyze a UV map and return detailed information
-        Returns dictionary with analysis data
-        """
-        # Create a new bmesh instance from mesh
-        bm = bmesh.new()
-        bm.from_mesh(mesh)
-        
-        # Ensure face indices are valid
-        bm.faces.ensure_lookup_table()
-        
-        # Get the UV layer
-        uv_layer_bmesh = bm.loops.layers.uv.get(uv_layer.name)
-        
-        analysis = {
-            'name': uv_layer.name,
-            'total_faces': 0,
-            'valid_faces': 0,
-            'total_points': 0,
-            'unique_points': 0,
-            'total_surface_area': 0.0,
-            'islands': 0,
-            'all_at_origin': True,
-            'is_empty': True
-        }
-        
-        if not uv_layer_bmesh:
-            bm.free()
-            return analysis
-        
-        unique_uvs = set()
-        face_areas = []
-        min_area_threshold = 1e-6
-        
-        # Analyze all faces
-        for face in bm.faces:
-            analysis['total_faces'] += 1
-            face_loops = face.loops
-            
-            if len(face_loops) < 3:  # Skip degenerate faces
-                continue
-            
-            analysis['valid_faces'] += 1
-            
-            # Get UV coordinates for this face
-            uv_coords = []
-            for loop in face_loops:
-                uv = loop[uv_layer_bmesh].uv
-                uv_coords.append([uv.x, uv.y])
-                unique_uvs.add((round(uv.x, 8), round(uv.y, 8)))  # Round for uniqueness check
-                analysis['total_points'] += 1
-                
-                # Check if any UV coordinate is not at origin
-                if abs(uv.x) > 1e-6 or abs(uv.y) > 1e-6:
-                    analysis['all_at_origin'] = False
-            
-            # Calculate UV area for this face
-            if len(uv_coords) >= 3:
-                face_area = abs(self.calculate_polygon_area(uv_coords))
-                face_areas.append(face_area)
-                analysis['total_surface_area'] += face_area
-        
-        analysis['unique_points'] = len(unique_uvs)
-        
-        # Estimate number of islands (simplified - counts disconnected UV coordinate groups)
-        analysis['islands'] = self.estimate_uv_islands(bm, uv_layer_bmesh)
-        
-        # Determine if UV map is considered empty
-        analysis['is_empty'] = (analysis['all_at_origin'] or 
-                              analysis['total_surface_area'] < min_area_threshold)
-        
-        bm.free()
-        return analysis
-
-    def estimate_uv_islands(self, bm, uv_layer):
+    def read_uv_data(self, mesh):
         """
-        Estimate the number of UV islands by analyzing connected UV coordinates
-        This is a simplified estimation
+        Read a mesh's face layout and the coordinates of every UV map with foreach_get
+        Returns (uv_maps, loop_starts, loop_totals) with uv_maps as a name: (loops, 2) array dictionary
         """
-        if not uv_layer:
-            return 0
+        face_count = len(mesh.polygons)
+        loop_count = len(mesh.loops)
+        loop_starts = np.empty(face_count, dtype=np.int32)
+        mesh.polygons.foreach_get('loop_start', loop_starts)
+        loop_totals = np.empty(face_count, dtype=np.int32)
+        mesh.polygons.foreach_get('loop_total', loop_totals)
         
-        visited_faces = set()
-        islands = 0
+        uv_maps = {}
+        for uv_layer in mesh.uv_layers:
+            uvs = np.empty(loop_count * 2, dtype=np.float32)
+            uv_layer.data.foreach_get('uv', uvs)
+            uv_maps[uv_layer.name] = uvs.reshape(-1, 2)
         
-        # Simple island detection based on shared UV coordinates
-        for face in bm.faces:
-            if face.index in visited_faces:
-                continue
-            
-            # Start a new island
-            islands += 1
-            island_faces = [face]
-            visited_faces.add(face.index)
-            
-            # Get UV coordinates for this face
-            face_uvs = []
-            for loop in face.loops:
-                uv = loop[uv_layer].uv
-                face_uvs.append((round(uv.x, 6), round(uv.y, 6)))
-            
-            # Find connected faces (simplified - faces sharing UV coordinates)
-            i = 0
-            while i < len(island_faces):
-                current_face = island_faces[i]
-                current_uvs = []
-                for loop in current_face.loops:
-                    uv = loop[uv_layer].uv
-                    current_uvs.append((round(uv.x, 6), round(uv.y, 6)))
-                
-                # Check other faces for shared UV coordinates
-                for other_face in bm.faces:
-                    if other_face.index in visited_faces:
-                        continue
-                    
-                    other_uvs = []
-                    for loop in other_face.loops:
-                        uv = loop[uv_layer].uv
-                        other_uvs.append((round(uv.x, 6), round(uv.y, 6)))
-                    
-                    # If faces share UV coordinates, they're connected
-                    if any(uv in other_uvs for uv in current_uvs):
-                        island_faces.append(other_face)
-                        visited_faces.add(other_face.index)
-                
-                i += 1
-        
-        return islands
+        return uv_maps, loop_starts, loop_totals
 
-    def is_uv_map_empty(self, mesh, uv_layer):
+    def is_uv_map_empty(self, analysis):
         """
-        Check if a UV map is empty or has insignificant surface area
+        Check if an analyzed UV map is empty or has insignificant surface area
         Returns True if empty, False otherwise
         """
-        analysis = self.analyze_uv_map(mesh, uv_layer)
-        
         # Print detailed analysis
-        print(f"    UV Map Analysis for '{analysis['name']}':")
-        print(f"      Total Faces: {analysis['total_faces']}")
-        print(f"      Valid Faces: {analysis['valid_faces']}")
-        print(f"      Total Points: {analysis['total_points']}")
-        print(f"      Unique Points: {analysis['unique_points']}")
-        print(f"      Estimated Islands: {analysis['islands']}")
-        print(f"      Total Surface Area: {analysis['total_surface_area']:.8f}")
-        print(f"      All at Origin: {analysis['all_at_origin']}")
-        print(f"      Considered Empty: {analysis['is_empty']}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("    UV Map Analysis for '%s':", analysis['name'])
+            logger.debug("      Total Faces: %d", analysis['total_faces'])
+            logger.debug("      Valid Faces: %d", analysis['valid_faces'])
+            logger.debug("      Total Points: %d", analysis['total_points'])
+            unique_points = analysis['unique_points'] if analysis['unique_points'] >= 0 else "not counted"
+            logger.debug("      Unique Points: %s", unique_points)
+            islands = analysis['islands'] if analysis['islands'] >= 0 else "not estimated"
+            logger.debug("      Estimated Islands: %s", islands)
+            logger.debug("      Total Surface Area: %.8f", analysis['total_surface_area'])
+            logger.debug("      All at Origin: %s", analysis['all_at_origin'])
+            logger.debug("      Considered Empty: %s", analysis['is_empty'])
         
         return analysis['is_empty']
-    
-    def calculate_polygon_area(self, vertices):
-        """
-        Calculate the area of a polygon using the shoelace formula
-        vertices: list of [x, y] coordinates
-        """
-        if len(vertices) < 3:
-            return 0.0
-        
-        area = 0.0
-        n = len(vertices)
-        
-        for i in range(n):
-            j = (i + 1) % n
-            area += vertices[i][0] * vertices[j][1]
-            area -= vertices[j][0] * vertices[i][1]
-        
-        return area / 2.0
 
     def execute(self, context):
         """
@@ -197,46 +194,65 @@ class DAYZ_OT_CleanEmptyUVMaps(bpy.types.Operator):
             self.report({'ERROR'}, "No mesh objects selected")
             return {'CANCELLED'}
         
+        verbose = self.verbose
+        report_islands = self.report_islands
+        logger.setLevel(logging.DEBUG if verbose else logging.WARNING)
+        
         total_deleted = 0
         processed_objects = 0
         
+        # Mesh data is read on the main thread and analyzed in worker threads, once per mesh
+        with ThreadPoolExecutor() as pool:
+            jobs = {}
+            for obj in selected_objects:
+                if obj.data.uv_layers and obj.data not in jobs:
+                    jobs[obj.data] = pool.submit(analyze_all_uv_maps, *self.read_uv_data(obj.data), report_islands, verbose)
+            analyses_by_mesh = {mesh: job.result() for mesh, job in jobs.items()}
+        
         for obj in selected_objects:
-            if not obj.data.uv_layers:
-                self.report({'INFO'}, f"Object '{obj.name}' has no UV maps")
+            mesh = obj.data
+            obj_name = obj.name
+            if not mesh.uv_layers:
+                self.report({'INFO'}, f"Object '{obj_name}' has no UV maps")
                 continue
             
-            # Get all UV layers for this object
-            uv_layers = list(obj.data.uv_layers)
-            empty_uv_maps = []
-            non_empty_uv_maps = []
+            # Track UV maps by name, since removing a layer invalidates the other layer references
+            empty_uv_names = []
+            non_empty_uv_names = []
             
-            print(f"\nChecking object: {obj.name}")
-            print(f"Total UV maps: {len(uv_layers)}")
+            logger.debug("\nChecking object: %s", obj_name)
+            logger.debug("Total UV maps: %d", len(mesh.uv_layers))
             
-            # Categorize UV maps as empty or non-empty
-            for uv_layer in uv_layers:
-                if self.is_uv_map_empty(obj.data, uv_layer):
-                    empty_uv_maps.append(uv_layer)
-                    print(f"  - Empty/insignificant UV map found: {uv_layer.name}")
+            # Categorize UV maps as empty or non-empty; maps already removed through
+            # another object sharing this mesh are left out
+            uv_layers = mesh.uv_layers
+            for uv_name, analysis in analyses_by_mesh[mesh].items():
+                if uv_name not in uv_layers:
+                    continue
+                if self.is_uv_map_empty(analysis):
+                    empty_uv_names.append(uv_name)
+                    logger.debug("  - Empty/insignificant UV map found: %s", uv_name)
                 else:
-                    non_empty_uv_maps.append(uv_layer)
-                    print(f"  - Valid UV map: {uv_layer.name}")
+                    non_empty_uv_names.append(uv_name)
+                    logger.debug("  - Valid UV map: %s", uv_name)
             
             # Only delete empty UV maps if there's at least one non-empty map remaining
-            if len(non_empty_uv_maps) > 0 and len(empty_uv_maps) > 0:
-                for uv_map in empty_uv_maps:
-                    print(f"  - Deleting empty/insignificant UV map: {uv_map.name}")
-                    obj.data.uv_layers.remove(uv_map)
+            if len(non_empty_uv_names) > 0 and len(empty_uv_names) > 0:
+                # Remove from the last index down, so the remaining indices stay valid
+                for index in sorted((uv_layers.find(name) for name in empty_uv_names), reverse=True):
+                    uv_map = uv_layers[index]
+                    logger.debug("  - Deleting empty/insignificant UV map: %s", uv_map.name)
+                    uv_layers.remove(uv_map)
                     total_deleted += 1
                 processed_objects += 1
-            elif len(empty_uv_maps) > 0:
-                print(f"  - Skipping deletion: all UV maps are empty/insignificant, keeping at least one")
+            elif len(empty_uv_names) > 0:
+                logger.debug("  - Skipping deletion: all UV maps are empty/insignificant, keeping at least one")
                 processed_objects += 1
             else:
-                print(f"  - No empty/insignificant UV maps found")
+                logger.debug("  - No empty/insignificant UV maps found")
                 processed_objects += 1
         
-        print(f"\nOperation complete. Processed {processed_objects} objects, deleted {total_deleted} empty UV maps total.")
+        logger.info("\nOperation complete. Processed %d objects, deleted %d empty UV maps total.", processed_objects, total_deleted)
         self.report({'INFO'}, f"Processed {processed_objects} objects, deleted {total_deleted} empty UV maps")
         
         return {'FINISHED'}
@@ -246,15 +262,4 @@ uv_cleaner_classes = (
     DAYZ_OT_CleanEmptyUVMaps,
 )
 
-def register_uv_cleaner():
-    """Register UV cleaner classes"""
-    for cls in uv_cleaner_classes:
-        bpy.utils.register_class(cls)
-
-def unregister_uv_cleaner():
-    """Unregister UV cleaner classes"""
-    for cls in reversed(uv_cleaner_classes):
-        try:
-            bpy.utils.unregister_class(cls)
-        except RuntimeError:
-            pass
\ No newline at end of file
+register_uv_cleaner, unregister_uv_cleaner = bpy.utils.register_classes_factory(uv_cleaner_classes)
\ No newline at end of file
@@ -1,52 +1,155 @@
 import bpy
+from fnmatch import fnmatchcase
+from itertools import islice
+from ..utils import scene_mesh_count
+
+# Selected mesh object count per view layer; selection changes come with a depsgraph
+# update, so the counts are dropped on every update and redraws in between reuse them
+_selected_mesh_counts = {}
+
+@bpy.app.handlers.persistent
+def clear_selected_mesh_counts(*args):
+    """Drop all cached selected mesh counts"""
+    _selected_mesh_counts.clear()
+
+def selected_mesh_count(context):
+    """Number of selected mesh objects, counted again only after a depsgraph update"""
+    key = context.view_layer.as_pointer()
+    count = _selected_mesh_counts.get(key)
+    if count is None:
+        count = sum(1 for obj in context.selected_objects if obj.type == 'MESH')
+        _selected_mesh_counts[key] = count
+    return count
+
+# Static bullet lists shown at the bottom of the panels
+BATCH_P3D_REQUIREMENTS = (
+    "• Arma 3 Object Builder addon",
+    "• Objects should be manifold meshes",
+    "• Materials should be properly set up",
+)
+
+UV_CLEANUP_INFO = (
+    "• Removes UV maps with all coordinates at (0,0)",
+    "• Preserves at least one UV map per object",
+    "• Safe operation - won't break your models",
+    "• Works on selected mesh objects only",
+)
+
+def draw_info_box(layout, title, lines):
+    """Draw a titled box with one bullet label per line"""
+    box = layout.box()
+    box.label(text=title, icon='INFO')
+    col = box.column(align=True)
+    for line in lines:
+        col.label(text=line, icon='DOT')
+
+# Row number prefixes "1: " to "1024: " for the UI lists, built once
+_IDX_PREFIX = tuple(f"{i + 1}: " for i in range(1024))
+
+def row_prefix(index):
+    """Row number prefix of a UI list row"""
+    return _IDX_PREFIX[index] if index < len(_IDX_PREFIX) else f"{index + 1}: "
+
+def filter_flags_by_name(ui_list, names):
+    """UIList filter flags showing the rows whose name matches the list's filter text"""
+    flag = ui_list.bitflag_filter_item
+    if not ui_list.filter_name:
+        return [flag] * len(names)
+    # Same case-insensitive wildcard match as Blender's default list filter
+    pattern = f"*{ui_list.filter_name}*".lower()
+    return [flag if fnmatchcase(name.lower(), pattern) else 0 for name in names]
+
+def sort_order_by_name(ui_list, names):
+    """UIList row order sorted by name when the list's alphabetical sort is enabled
+    Blender applies the list's reverse option to the returned order itself
+    """
+    if not ui_list.use_filter_sort_alpha:
+        return []
+    return bpy.types.UI_UL_list.sort_items_helper(list(enumerate(names)), key=lambda item: item[1].lower())
 
 class DAYZ_UL_NamedPropertiesList(bpy.types.UIList):
     """UIList for named properties"""
     
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
-        if self.layout_type in {'DEFAULT', 'COMPACT'}:
-            row = layout.row(align=True)
-            row.label(text=f"{index + 1}:", icon='PROPERTIES')
-            row.label(text=f"{item.name or '(empty)'} = {item.value or '(empty)'}")
-        elif self.layout_type in {'GRID'}:
-            layout.alignment = 'CENTER'
-            layout.label(text=item.name or f"Property {index + 1}")
+        # DEFAULT and COMPACT share the row layout
+        if self.layout_type != 'GRID':
+            self._draw_default(layout, item, index)
+        else:
+            self._draw_grid(layout, item, index)
+
+    def _draw_default(self, layout, item, index):
+        row = layout.row(align=True)
+        row.label(text=row_prefix(index), icon='PROPERTIES')
+        row.label(text=f"{item.name or '(empty)'} = {item.value or '(empty)'}")
+
+    def _draw_grid(self, layout, item, index):
+        layout.alignment = 'CENTER'
+        layout.label(text=item.name or f"Property {index + 1}")
+
+    def filter_items(self, context, data, propname):
+        names = [item.name for item in getattr(data, propname)]
+        return filter_flags_by_name(self, names), sort_order_by_name(self, names)
 
 class DAYZ_UL_TargetObjectsList(bpy.types.UIList):
     """UIList for target objects"""
     
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
-        if self.layout_type in {'DEFAULT', 'COMPACT'}:
-            row = layout.row(align=True)
-            if item.obj:
-                row.label(text=f"{index + 1}: {item.obj.name}", icon='OBJECT_DATA')
-            else:
-                row.label(text=f"{index + 1}: (No Object)", icon='ERROR')
-        elif self.layout_type in {'GRID'}:
-            layout.alignment = 'CENTER'
-            if item.obj:
-                layout.label(text=item.obj.name, icon='OBJECT_DATA')
-            else:
-                layout.label(text=f"Target {index + 1}", icon='ERROR')
+        # DEFAULT and COMPACT share the row layout
+        if self.layout_type != 'GRID':
+            self._draw_default(layout, item, index)
+        else:
+            self._draw_grid(layout, item, index)
+
+    def _draw_default(self, layout, item, index):
+        obj = item.obj
+        row = layout.row(align=True)
+        if obj:
+            row.label(text=row_prefix(index) + obj.name, icon='OBJECT_DATA')
+        else:
+            row.label(text=row_prefix(index) + "(No Object)", icon='ERROR')
+
+    def _draw_grid(self, layout, item, index):
+        obj = item.obj
+        layout.alignment = 'CENTER'
+        if obj:
+            layout.label(text=obj.name, icon='OBJECT_DATA')
+        else:
+            layout.label(text=f"Target {index + 1}", icon='ERROR')
+
+    def filter_items(self, context, data, propname):
+        names = [item.obj.name if item.obj else "" for item in getattr(data, propname)]
+        return filter_flags_by_name(self, names), sort_order_by_name(self, names)
 
 class DAYZ_UL_GrassObjectsList(bpy.types.UIList):
     """UIList for grass objects"""
     
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
-        if self.layout_type in {'DEFAULT', 'COMPACT'}:
-            row = layout.row(align=True)
-            if item.obj:
-                row.label(text=f"{index + 1}: {item.obj.name}", icon='MESH_DATA')
-                row.prop(item, "weight", text="Weight", slider=True)
-            else:
-                row.label(text=f"{index + 1}: (No Object)", icon='ERROR')
-                row.prop(item, "weight", text="Weight", slider=True)
-        elif self.layout_type in {'GRID'}:
-            layout.alignment = 'CENTER'
-            if item.obj:
-                layout.label(text=item.obj.name, icon='MESH_DATA')
-            else:
-                layout.label(text=f"Grass {index + 1}", icon='ERROR')
+        # DEFAULT and COMPACT share the row layout
+        if self.layout_type != 'GRID':
+            self._draw_default(layout, item, index)
+        else:
+            self._draw_grid(layout, item, index)
+
+    def _draw_default(self, layout, item, index):
+        obj = item.obj
+        row = layout.row(align=True)
+        if obj:
+            row.label(text=row_prefix(index) + obj.name, icon='MESH_DATA')
+        else:
+            row.label(text=row_prefix(index) + "(No Object)", icon='ERROR')
+        row.prop(item, "weight", text="Weight", slider=True)
+
+    def _draw_grid(self, layout, item, index):
+        obj = item.obj
+        layout.alignment = 'CENTER'
+        if obj:
+            layout.label(text=obj.name, icon='MESH_DATA')
+        else:
+            layout.label(text=f"Grass {index + 1}", icon='ERROR')
+
+    def filter_items(self, context, data, propname):
+        names = [item.obj.name if item.obj else "" for item in getattr(data, propname)]
+        return filter_flags_by_name(self, names), sort_order_by_name(self, names)
 
 class DAYZ_PT_main_panel(bpy.types.Panel):
     bl_label = "DayZ Asset Tools"
@@ -77,17 +180,19 @@ class DAYZ_PT_BatchPropertiesPanel(bpy.types.Panel):
     def draw(self, context):
         layout = self.layout
         settings = context.scene.dayz_batch_properties_settings
+        named_properties = settings.named_properties
+        n_properties = len(named_properties)
 
         # Target Directory Section
         box = layout.box()
         box.label(text="Target Directory", icon='FOLDER_REDIRECT')
         
-        col = box.column()
-        row = col.row()
+        row = box.row()
         row.prop(settings, "target_directory", text="")
         row.operator("dayz.select_directory", text="", icon='FILEBROWSER')
         
-        col.prop(settings, "recursive_search")
+        box.prop(settings, "recursive_search")
+        box.prop(settings, "verbose")
 
         layout.separator()
 
@@ -97,12 +202,9 @@ class DAYZ_PT_BatchPropertiesPanel(bpy.types.Panel):
         
         row = box.row(align=True)
         row.operator("dayz.add_named_property", text="Add", icon='ADD')
+        row.operator("dayz.remove_named_property", text="Remove", icon='REMOVE')
         
-        remove_row = row.row(align=True)
-        remove_row.enabled = len(settings.named_properties) > 0
-        remove_row.operator("dayz.remove_named_property", text="Remove", icon='REMOVE')
-        
-        if settings.named_properties:
+        if n_properties:
             box.template_list(
                 "DAYZ_UL_NamedPropertiesList", "",
                 settings, "named_properties",
@@ -110,14 +212,14 @@ class DAYZ_PT_BatchPropertiesPanel(bpy.types.Panel):
                 rows=3
             )
             
-            if 0 <= settings.named_properties_index < len(settings.named_properties):
-                selected_prop = settings.named_properties[settings.named_properties_index]
+            index = settings.named_properties_index
+            if 0 <= index < n_properties:
+                selected_prop = named_properties[index]
                 prop_box = box.box()
                 prop_box.label(text="Edit Selected Property:", icon='GREASEPENCIL')
                 
-                col = prop_box.column()
-                col.prop(selected_prop, "name", text="Property Name")
-                col.prop(selected_prop, "value", text="Property Value")
+                prop_box.prop(selected_prop, "name", text="Property Name")
+                prop_box.prop(selected_prop, "value", text="Property Value")
         else:
             box.label(text="No properties added", icon='INFO')
 
@@ -127,14 +229,14 @@ class DAYZ_PT_BatchPropertiesPanel(bpy.types.Panel):
         row = layout.row()
         row.scale_y = 2.0
         
-        if not settings.target_directory or not settings.named_properties:
+        if not settings.target_directory or not n_properties:
             row.enabled = False
         
         row.operator("dayz.process_batch_properties", text="Process", icon='PLAY')
         
         if not settings.target_directory:
             layout.label(text="Select target directory", icon='ERROR')
-        elif not settings.named_properties:
+        elif not n_properties:
             layout.label(text="Add at least one property", icon='ERROR')
 
 class DAYZ_PT_GrassPlacerPanel(bpy.types.Panel):
@@ -149,24 +251,23 @@ class DAYZ_PT_GrassPlacerPanel(bpy.types.Panel):
     def draw(self, context):
         layout = self.layout
         settings = context.scene.dayz_grass_placer_settings
+        targets = settings.target_objects
+        n_targets = len(targets)
+        grass_objects = settings.grass_objects
+        n_grass = len(grass_objects)
 
         # Target Objects Section
         box = layout.box()
         box.label(text="Target Objects", icon='SURFACE_DATA')
         
-        row = box.row(align=True)
-        row.operator("dayz.add_target_object", text="Add", icon='ADD')
-        remove_row = row.row(align=True)
-        remove_row.enabled = len(settings.target_objects) > 0
-        remove_row.operator("dayz.remove_target_object", text="Remove", icon='REMOVE')
-        
-        row = box.row(align=True)
-        row.operator("dayz.add_selected_to_targets", text="Add Selected", icon='PLUS')
-        clear_row = row.row(align=True)
-        clear_row.enabled = len(settings.target_objects) > 0
-        clear_row.operator("dayz.clear_target_objects", text="Clear", icon='X')
+        # Add/Remove over Add Selected/Clear in one two-column grid
+        grid = box.grid_flow(row_major=True, columns=2, even_columns=True, align=True)
+        grid.operator("dayz.add_target_object", text="Add", icon='ADD')
+        grid.operator("dayz.remove_target_object", text="Remove", icon='REMOVE')
+        grid.operator("dayz.add_selected_to_targets", text="Add Selected", icon='PLUS')
+        grid.operator("dayz.clear_target_objects", text="Clear", icon='X')
         
-        if settings.target_objects:
+        if n_targets:
             box.template_list(
                 "DAYZ_UL_TargetObjectsList", "",
                 settings, "target_objects",
@@ -174,8 +275,8 @@ class DAYZ_PT_GrassPlacerPanel(bpy.types.Panel):
                 rows=3
             )
             
-            if 0 <= settings.target_objects_index < len(settings.target_objects):
-                selected_target = settings.target_objects[settings.target_objects_index]
+            if 0 <= settings.target_objects_index < n_targets:
+                selected_target = targets[settings.target_objects_index]
                 target_box = box.box()
                 target_box.prop(selected_target, "obj", text="Target Object")
         else:
@@ -187,19 +288,14 @@ class DAYZ_PT_GrassPlacerPanel(bpy.types.Panel):
         box = layout.box()
         box.label(text="Grass Objects", icon='MESH_DATA')
         
-        row = box.row(align=True)
-        row.operator("dayz.add_grass_object", text="Add", icon='ADD')
-        remove_row = row.row(align=True)
-        remove_row.enabled = len(settings.grass_objects) > 0
-        remove_row.operator("dayz.remove_grass_object", text="Remove", icon='REMOVE')
-
-        row = box.row(align=True)
-        row.operator("dayz.add_selected_to_grass", text="Add Selected", icon='PLUS')
-        clear_row = row.row(align=True)
-        clear_row.enabled = len(settings.grass_objects) > 0
-        clear_row.operator("dayz.clear_grass_objects", text="Clear", icon='X')
+        # Add/Remove over Add Selected/Clear in one two-column grid
+        grid = box.grid_flow(row_major=True, columns=2, even_columns=True, align=True)
+        grid.operator("dayz.add_grass_object", text="Add", icon='ADD')
+        grid.operator("dayz.remove_grass_object", text="Remove", icon='REMOVE')
+        grid.operator("dayz.add_selected_to_grass", text="Add Selected", icon='PLUS')
+        grid.operator("dayz.clear_grass_objects", text="Clear", icon='X')
         
-        if settings.grass_objects:
+        if n_grass:
             box.template_list(
                 "DAYZ_UL_GrassObjectsList", "",
                 settings, "grass_objects",
@@ -207,14 +303,13 @@ class DAYZ_PT_GrassPlacerPanel(bpy.types.Panel):
                 rows=3
             )
             
-            if 0 <= settings.grass_objects_index < len(settings.grass_objects):
-                selected_grass = settings.grass_objects[settings.grass_objects_index]
+            if 0 <= settings.grass_objects_index < n_grass:
+                selected_grass = grass_objects[settings.grass_objects_index]
                 grass_box = box.box()
                 grass_box.label(text="Edit Selected Grass:", icon='GREASEPENCIL')
                 
-                col = grass_box.column()
-                col.prop(selected_grass, "obj", text="Grass Object")
-                col.prop(selected_grass, "weight", text="Weight", slider=True)
+                grass_box.prop(selected_grass, "obj", text="Grass Object")
+                grass_box.prop(selected_grass, "weight", text="Weight", slider=True)
         else:
             box.label(text="No grass objects added", icon='INFO')
 
@@ -240,20 +335,14 @@ class DAYZ_PT_GrassPlacerPanel(bpy.types.Panel):
 
         layout.separator()
 
-        # Distribution Settings
+        # Distribution and Variation Settings
         box = layout.box()
-        box.label(text="Distribution", icon='FORCE_TURBULENCE')
+        box.label(text="Distribution & Variation", icon='FORCE_TURBULENCE')
         
         col = box.column()
         col.prop(settings, "clumping_factor", slider=True)
-
-        layout.separator()
-
-        # Variation Settings
-        box = layout.box()
-        box.label(text="Variation", icon='MODIFIER_DATA')
         
-        col = box.column()
+        col.separator(factor=0.5)
         row = col.row(align=True)
         row.prop(settings, "scale_min")
         row.prop(settings, "scale_max")
@@ -267,6 +356,7 @@ class DAYZ_PT_GrassPlacerPanel(bpy.types.Panel):
         
         col = box.column()
         col.prop(settings, "parent_to_empty")
+        col.prop(settings, "share_mesh_data")
         
         col.separator()
         col.label(text="Merge Options:")
@@ -292,6 +382,7 @@ class DAYZ_PT_BatchP3DPanel(bpy.types.Panel):
     bl_region_type = 'UI'
     bl_category = 'DayZ Tools'
     bl_parent_id = "DAYZ_PT_main_panel"
+    bl_options = {'DEFAULT_CLOSED'}
 
     def draw(self, context):
         layout = self.layout
@@ -300,11 +391,11 @@ class DAYZ_PT_BatchP3DPanel(bpy.types.Panel):
         box = layout.box()
         box.label(text="Export Individual P3D Files", icon='EXPORT')
         
-        selected_meshes = [obj for obj in context.selected_objects if obj.type == 'MESH']
-        total_meshes = len([obj for obj in context.scene.objects if obj.type == 'MESH'])
+        selected_meshes = selected_mesh_count(context)
+        total_meshes = scene_mesh_count(context.scene)
         
         col = box.column()
-        col.label(text=f"Selected meshes: {len(selected_meshes)}", icon='OBJECT_DATA')
+        col.label(text=f"Selected meshes: {selected_meshes}", icon='OBJECT_DATA')
         col.label(text=f"Total meshes in scene: {total_meshes}", icon='SCENE_DATA')
         
         layout.separator()
@@ -314,18 +405,13 @@ class DAYZ_PT_BatchP3DPanel(bpy.types.Panel):
         row.scale_y = 2.0
         
         if selected_meshes:
-            row.operator("dayz.batch_export_p3d", text=f"Export {len(selected_meshes)} Objects as P3D", icon='EXPORT')
+            row.operator("dayz.batch_export_p3d", text=f"Export {selected_meshes} Objects as P3D", icon='EXPORT')
         else:
             row.operator("dayz.batch_export_p3d", text="Export All Meshes as P3D", icon='EXPORT')
         
         # Requirements info
         layout.separator()
-        box = layout.box()
-        box.label(text="Requirements:", icon='INFO')
-        col = box.column(align=True)
-        col.label(text="• Arma 3 Object Builder addon", icon='DOT')
-        col.label(text="• Objects should be manifold meshes", icon='DOT')
-        col.label(text="• Materials should be properly set up", icon='DOT')
+        draw_info_box(layout, "Requirements:", BATCH_P3D_REQUIREMENTS)
 
 # Panel for the Texturing & UV Mapping tools
 class DAYZ_PT_TexturingUVPanel(bpy.types.Panel):
@@ -336,6 +422,7 @@ class DAYZ_PT_TexturingUVPanel(bpy.types.Panel):
     bl_region_type = 'UI'
     bl_category = 'DayZ Tools'
     bl_parent_id = "DAYZ_PT_main_panel"
+    bl_options = {'DEFAULT_CLOSED'}
 
     def draw(self, context):
         layout = self.layout
@@ -344,44 +431,40 @@ class DAYZ_PT_TexturingUVPanel(bpy.types.Panel):
         box = layout.box()
         box.label(text="UV Map Cleanup", icon='GROUP_UVS')
         
-        selected_meshes = [obj for obj in context.selected_objects if obj.type == 'MESH']
+        # Only the first 3 selected meshes are listed, the rest are just counted
+        selected_meshes = (obj for obj in context.selected_objects if obj.type == 'MESH')
+        shown_meshes = list(islice(selected_meshes, 3))
+        remaining_meshes = sum(1 for _ in selected_meshes)
+        mesh_count = len(shown_meshes) + remaining_meshes
         
-        col = box.column()
-        if selected_meshes:
-            col.label(text=f"Selected mesh objects: {len(selected_meshes)}", icon='OBJECT_DATA')
+        if shown_meshes:
+            col = box.column()
+            col.label(text=f"Selected mesh objects: {mesh_count}", icon='OBJECT_DATA')
             
             # Show UV map info for selected objects
-            total_uv_maps = 0
-            for obj in selected_meshes[:3]:  # Show info for first 3 objects
-                if obj.data.uv_layers:
-                    uv_count = len(obj.data.uv_layers)
-                    total_uv_maps += uv_count
+            for obj in shown_meshes:
+                uv_count = len(obj.data.uv_layers)
+                if uv_count:
                     col.label(text=f"  {obj.name}: {uv_count} UV maps", icon='DOT')
                 else:
                     col.label(text=f"  {obj.name}: No UV maps", icon='DOT')
             
-            if len(selected_meshes) > 3:
-                col.label(text=f"  ... and {len(selected_meshes) - 3} more objects", icon='DOT')
+            if remaining_meshes:
+                col.label(text=f"  ... and {remaining_meshes} more objects", icon='DOT')
         else:
-            col.label(text="No mesh objects selected", icon='INFO')
+            box.label(text="No mesh objects selected", icon='INFO')
         
         layout.separator()
         
         # Clean UV Maps button
         row = layout.row()
         row.scale_y = 1.5
-        row.enabled = len(selected_meshes) > 0
+        row.enabled = mesh_count > 0
         row.operator("dayz.clean_empty_uv_maps", text="Clean Empty UV Maps", icon='TRASH')
         
         # Info section
         layout.separator()
-        box = layout.box()
-        box.label(text="UV Cleanup Info:", icon='INFO')
-        col = box.column(align=True)
-        col.label(text="• Removes UV maps with all coordinates at (0,0)", icon='DOT')
-        col.label(text="• Preserves at least one UV map per object", icon='DOT')
-        col.label(text="• Safe operation - won't break your models", icon='DOT')
-        col.label(text="• Works on selected mesh objects only", icon='DOT')
+        draw_info_box(layout, "UV Cleanup Info:", UV_CLEANUP_INFO)
 
 # Register panels
 panels = (
@@ -395,15 +478,20 @@ panels = (
     DAYZ_PT_TexturingUVPanel,
 )
 
+_register_panel_classes, _unregister_panel_classes = bpy.utils.register_classes_factory(panels)
+
 def register():
-    """Register UI panels"""
-    for cls in panels:
-        bpy.utils.register_class(cls)
+    """Register panel classes"""
+    _register_panel_classes()
+    
+    bpy.app.handlers.depsgraph_update_post.append(clear_selected_mesh_counts)
+    bpy.app.handlers.load_post.append(clear_selected_mesh_counts)
 
 def unregister():
-    """Unregister UI panels"""
-    for cls in reversed(panels):
-        try:
-            bpy.utils.unregister_class(cls)
-        except RuntimeError:
-            pass
\ No newline at end of file
+    """Unregister panel classes"""
+    for handlers in (bpy.app.handlers.depsgraph_update_post, bpy.app.handlers.load_post):
+        if clear_selected_mesh_counts in handlers:
+            handlers.remove(clear_selected_mesh_counts)
+    _selected_mesh_counts.clear()
+    
+    _unregister_panel_classes()
\ No newline at end of file
@@ -0,0 +1,7 @@
+"""
+Shared helpers for DayZ Asset Tools operators and panels
+"""
+
+def scene_mesh_count(scene):
+    """Return the number of mesh objects in a scene"""
+    return sum(obj.type == 'MESH' for obj in scene.objects)